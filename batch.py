@@ -0,0 +1,94 @@
+import time
+import importlib
+import multiprocessing
+from budget import Budget
+from budget import BudgetExceeded
+from cache import ProgramCache
+
+class BatchResult: # how one job of a batch went
+    __slots__ = ("index_", "output_", "error_type_", "error_line_", "message_", "seconds_", "meter_")
+
+    def __init__(self, index, output, error_type, error_line, message, seconds, meter):
+        self.index_ = index # position of the job in the batch
+        self.output_ = output # printed lines
+        self.error_type_ = error_type # name of the ErrorType the program stopped with, "BUDGET_EXCEEDED", or None
+        self.error_line_ = error_line
+        self.message_ = message # text of the exception, None if the program ran to the end
+        self.seconds_ = seconds # time spent compiling and running it
+        self.meter_ = meter # Budget.meter() of the run, steps, calls and allocations it used
+
+class BatchWorker: # what a pool process keeps between jobs
+    def __init__(self, version, cache_size, budget, cache_dir):
+        self.budget_ = budget if (budget != None) else Budget() # limits of each job, a job is always metered
+        self.interpreter_ = importlib.import_module("interpreterv" + str(version)).Interpreter(console_output = False, budget = self.budget_) # reset between jobs
+        self.cache_size_ = cache_size # most compiled programs kept
+        self.cache_ = {} # program text to its bytecode, oldest first
+        self.disk_cache_ = ProgramCache(cache_dir) if (cache_dir != None) else None # shared by the workers and kept between batches
+
+    def bytecode(self, interpreter, program): # compiled once per worker, for the versions that compile
+        key = "\n".join(program)
+        bytecode = self.cache_.pop(key, None)
+        if (bytecode == None):
+            if (self.disk_cache_ != None):
+                bytecode = self.disk_cache_.bytecode(interpreter, program)
+            else:
+                bytecode = interpreter.compile(program)
+            if (self.cache_size_ <= 0): # caching turned off
+                return bytecode
+            if (len(self.cache_) >= self.cache_size_): # drop the least recently used
+                del self.cache_[next(iter(self.cache_))]
+        self.cache_[key] = bytecode
+        return bytecode
+
+    def run(self, index, program, input):
+        if (isinstance(program, str)):
+            program = program.split("\n")
+        interpreter = self.interpreter_
+        interpreter.reset() # output log, input cursor and error of the base
+        interpreter.reset_all_variables()
+        interpreter.input = input
+        self.budget_.start() # a job that fails to compile reports zero usage, not the last job's
+        message = None
+        error_type = None
+        error_line = None
+        start = time.perf_counter()
+        try:
+            if (hasattr(interpreter, "run_bytecode")):
+                interpreter.run_bytecode(self.bytecode(interpreter, program))
+            else:
+                interpreter.run(program)
+        except BudgetExceeded as e:
+            message = str(e)
+            error_type = "BUDGET_EXCEEDED"
+            error_line = e.line_num_
+        except Exception as e:
+            message = str(e)
+        seconds = time.perf_counter() - start
+        if (interpreter.error_type != None):
+            error_type = interpreter.error_type.name
+            error_line = interpreter.error_line
+        return BatchResult(index, interpreter.get_output(), error_type, error_line, message, seconds, self.budget_.meter())
+
+worker_ = None # BatchWorker of this process
+
+def init_worker(version, cache_size, budget, cache_dir):
+    global worker_
+    worker_ = BatchWorker(version, cache_size, budget, cache_dir)
+
+def run_job(job):
+    index, (program, input) = job
+    return worker_.run(index, program, input)
+
+# jobs is an iterable of (program, input), where a program is a string or an array of strings and input an array of strings or None
+# yields a BatchResult for each job as soon as it finishes, so not in the order of the jobs
+# budget is a Budget whose limits every job gets, so a runaway program only costs its own job
+# cache_dir is a directory where compiled programs are kept for later batches, see ProgramCache
+def run_batch(jobs, version = 3, processes = None, chunksize = 1, cache_size = 256, budget = None, cache_dir = None):
+    if (processes == 0): # run in this process, e.g. for debugging
+        init_worker(version, cache_size, budget, cache_dir)
+        for job in enumerate(jobs):
+            yield run_job(job)
+        return
+    with multiprocessing.Pool(processes, initializer = init_worker, initargs = (version, cache_size, budget, cache_dir)) as pool:
+        for result in pool.imap_unordered(run_job, enumerate(jobs), chunksize):
+            yield result
@@ -0,0 +1,120 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import platform
+import importlib
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # the interpreters live one level up
+sys.path.insert(0, ROOT)
+
+from streams import DiscardSink
+
+def find_engines(): # version num of every interpreterv*.py, so new engines are benchmarked too
+    versions = []
+    for path in glob.glob(os.path.join(ROOT, "interpreterv*.py")):
+        name = os.path.basename(path)[len("interpreterv"):-len(".py")]
+        if (name.isdigit()):
+            versions.append(int(name))
+    return sorted(versions)
+
+def load_programs(directory): # name to a list of (versions it runs on, path, lines)
+    programs = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.brewin"))):
+        lines = open(path).read().split("\n")
+        header = lines[0].split(":")
+        if (len(header) != 2 or header[0].strip() != "# versions"): # not a benchmark
+            continue
+        name = os.path.basename(path).split(".")[0]
+        programs.setdefault(name, []).append((header[1].split(), path, lines))
+    return programs
+
+def runs_on(versions, version): # "2" is only v2, "2+" is v2 and every later engine
+    for v in versions:
+        if (v.endswith("+") and version >= int(v[:-1])):
+            return True
+        elif (v == str(version)):
+            return True
+    return False
+
+def new_interpreter(module):
+    return module.Interpreter(console_output = False, output_sink = DiscardSink())
+
+def count_statements(module, program): # statements run, counted in a separate run so timing has no hooks
+    interpreter = new_interpreter(module)
+    count = [0]
+    if (hasattr(interpreter, "op_table_")): # engines dispatching through an opcode table
+        def counted(handler):
+            def step(*args):
+                count[0] += 1
+                return handler(*args)
+            return step
+        interpreter.op_table_ = [counted(handler) if (handler != None) else None for handler in interpreter.op_table_]
+    else:
+        interpret_statement = interpreter.interpret_statement
+        def step():
+            count[0] += 1
+            return interpret_statement()
+        interpreter.interpret_statement = step
+    interpreter.run(program)
+    return count[0]
+
+def peak_memory(module, program): # most bytes allocated at once while running it
+    tracemalloc.start()
+    new_interpreter(module).run(program)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def measure(module, program, repeat):
+    times = []
+    for _ in range(repeat):
+        interpreter = new_interpreter(module)
+        start = time.perf_counter()
+        interpreter.run(program)
+        times.append(time.perf_counter() - start)
+    statements = count_statements(module, program)
+    best = min(times)
+    return {"seconds": best, "seconds_all": times, "statements": statements,
+            "statements_per_second": statements / best if (best > 0) else None, "peak_bytes": peak_memory(module, program)}
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark the Brewin interpreters")
+    parser.add_argument("--engines", type = int, nargs = "*", help = "interpreter versions to run, all by default")
+    parser.add_argument("--only", nargs = "*", help = "benchmark names to run, all by default")
+    parser.add_argument("--repeat", type = int, default = 3, help = "timed runs of each program, the fastest is reported")
+    parser.add_argument("--output", default = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results.json"), help = "file the JSON results are written to")
+    parser.add_argument("--dir", default = os.path.dirname(os.path.abspath(__file__)), help = "directory of the .brewin programs")
+    args = parser.parse_args()
+
+    engines = args.engines if (args.engines) else find_engines()
+    programs = load_programs(args.dir)
+    results = []
+    for name in sorted(programs):
+        if (args.only and name not in args.only):
+            continue
+        for version in engines:
+            for versions, path, lines in programs[name]:
+                if (not runs_on(versions, version)):
+                    continue
+                module = importlib.import_module("interpreterv" + str(version))
+                result = {"benchmark": name, "engine": version, "program": os.path.basename(path)}
+                try:
+                    result.update(measure(module, lines, args.repeat))
+                except Exception as e: # engine failed on it, reported instead of stopping the suite
+                    result["error"] = str(e)
+                results.append(result)
+                if ("error" in result):
+                    print(name.ljust(16) + ("v" + str(version)).ljust(5) + "error: " + result["error"])
+                else:
+                    print(name.ljust(16) + ("v" + str(version)).ljust(5) + ("%.4fs" % result["seconds"]).rjust(10) +
+                          ("%d stmt/s" % result["statements_per_second"]).rjust(18) + ("%.1f KiB peak" % (result["peak_bytes"] / 1024)).rjust(18))
+    report = {"python": platform.python_version(), "platform": platform.platform(), "repeat": args.repeat, "results": results}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent = 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import time
+
+class BudgetExceeded(Exception): # a run went over one of the limits of its Budget, raised instead of an ErrorType
+    def __init__(self, limit, used, line_num):
+        self.limit_ = limit # "steps", "seconds", "depth" or "heap"
+        self.used_ = used # how much of it the run had used
+        self.line_num_ = line_num
+        super().__init__("BUDGET_EXCEEDED " + limit + " on line " + str(line_num))
+
+class Budget: # limits of a run and the metering of what it used, None for no limit
+    STEP_BYTES = 256 # most a statement adds to the heap, besides the values of the operators guard checks
+
+    def __init__(self, max_steps = None, max_seconds = None, max_depth = None, max_heap = None, check_every = 4096):
+        self.max_steps_ = max_steps # statements run
+        self.max_seconds_ = max_seconds # wall clock time
+        self.max_depth_ = max_depth # calls in progress below main
+        self.max_heap_ = max_heap # approximate bytes held by vars, objects and captured lambdas
+        self.check_every_ = check_every # most statements between checks of the time and heap limits, fewer as the heap nears its limit
+        self.start()
+
+    def start(self): # a run begins, metering starts from zero
+        self.steps_ = 0
+        self.calls_ = 0
+        self.line_allocations_ = 0 # vars and lambdas made by the statements run, frames are counted in calls_
+        self.depth_ = 0
+        self.max_depth_seen_ = 0
+        self.heap_ = None # bytes at the last check, None if it was never measured
+        self.heap_peak_ = None
+        self.allocated_ = 0 # bytes of the values guarded operators made since the heap was measured
+        self.started_ = time.perf_counter()
+        self.seconds_ = 0
+        self.deadline_ = self.started_ + self.max_seconds_ if (self.max_seconds_ != None) else None
+
+    def next_check(self): # step count at which the run loop calls check again
+        check = self.steps_ + self.check_every_
+        if (self.max_steps_ != None and self.max_steps_ + 1 < check): # steps are checked exactly
+            check = self.max_steps_ + 1
+        if (self.max_heap_ != None): # measured again before statements adding STEP_BYTES each could fill the room left
+            room = self.max_heap_ - (self.heap_ if (self.heap_ != None) else 0)
+            check = min(check, self.steps_ + max(1, room // self.STEP_BYTES))
+        return check
+
+    def check(self, interpreter): # after the run loop stored steps_, raises if a limit is exceeded
+        line_num = interpreter.ip_
+        if (self.max_steps_ != None and self.steps_ > self.max_steps_):
+            raise BudgetExceeded("steps", self.steps_, line_num)
+        if (self.deadline_ != None and time.perf_counter() > self.deadline_):
+            raise BudgetExceeded("seconds", time.perf_counter() - self.started_, line_num)
+        if (self.max_heap_ != None):
+            self.measure_heap(interpreter)
+            if (self.heap_ > self.max_heap_):
+                raise BudgetExceeded("heap", self.heap_, line_num)
+        return self.next_check()
+
+    def measure_heap(self, interpreter):
+        self.heap_ = interpreter.heap_size()
+        self.allocated_ = 0
+        if (self.heap_peak_ == None or self.heap_ > self.heap_peak_):
+            self.heap_peak_ = self.heap_
+
+    def allocate(self, interpreter, size): # a value of about size bytes is about to be made, raises before the heap could go over its limit
+        self.allocated_ += size
+        if (self.heap_ == None or self.heap_ + self.allocated_ > self.max_heap_): # over unless values were freed since the last measure
+            self.measure_heap(interpreter)
+            if (self.heap_ + size > self.max_heap_):
+                raise BudgetExceeded("heap", self.heap_ + size, interpreter.ip_)
+            self.allocated_ = size
+
+    def guard(self, interpreter, function, size): # function of two values that checks the heap has room for its result first
+        def guarded(a, b):
+            self.allocate(interpreter, size(a, b))
+            return function(a, b)
+        return guarded
+
+    def concat_size(self, a, b): # size of a + b on strings
+        return len(a) + len(b)
+
+    def product_size(self, a, b): # size of a * b on ints
+        return (a.bit_length() + b.bit_length()) // 8
+
+    def call(self, line_num): # a user func is called from line_num
+        self.calls_ += 1
+        self.depth_ += 1
+        if (self.depth_ > self.max_depth_seen_):
+            self.max_depth_seen_ = self.depth_
+        if (self.max_depth_ != None and self.depth_ > self.max_depth_):
+            raise BudgetExceeded("depth", self.depth_, line_num)
+
+    def tail(self): # a call that takes over its caller's frame, so the depth stays
+        self.calls_ += 1
+
+    def ret(self):
+        self.depth_ -= 1
+
+    def finish(self, interpreter): # the run ended, normally or not
+        self.seconds_ = time.perf_counter() - self.started_
+        self.measure_heap(interpreter)
+
+    def meter(self): # summary of the last run, e.g. for scheduling and billing
+        return {"steps": self.steps_, "calls": self.calls_, "allocations": self.line_allocations_ + self.calls_,
+                "max_depth": self.max_depth_seen_, "seconds": self.seconds_, "heap": self.heap_, "heap_peak": self.heap_peak_}
@@ -0,0 +1,114 @@
+import os
+import sys
+import mmap
+import marshal
+import hashlib
+import tempfile
+
+class ProgramCache: # compiled programs on disk, keyed by a hash of the source and the interpreter that compiled it
+    MAGIC = b"BRWNBC01" # start of every cache file, bump when the file layout changes
+    SUFFIX = ".bc"
+
+    def __init__(self, directory, max_bytes = 256 * 1024 * 1024, max_entries = None):
+        self.directory_ = directory
+        self.max_bytes_ = max_bytes # total size of the cache files, the least recently used go first
+        self.max_entries_ = max_entries # most cache files kept, None for no limit
+        self.hits_ = 0
+        self.misses_ = 0
+        os.makedirs(directory, exist_ok = True)
+
+    def tag(self, interpreter): # compiled forms are only shared by the same engine, bytecode version and marshal format
+        return "%s:%d:%d:%d.%d" % (type(interpreter).__module__, interpreter.BYTECODE_VERSION, marshal.version, sys.version_info[0], sys.version_info[1])
+
+    def key(self, interpreter, text):
+        return hashlib.sha256((self.tag(interpreter) + "\0" + text).encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory_, key + self.SUFFIX)
+
+    def bytecode(self, interpreter, program): # compiled form of program, loaded from the cache or compiled and stored
+        if (isinstance(program, str)):
+            program = program.split("\n")
+        key = self.key(interpreter, "\n".join(program))
+        bytecode = self.load(interpreter, key)
+        if (bytecode != None):
+            self.hits_ += 1
+            return bytecode
+        self.misses_ += 1
+        bytecode = interpreter.compile(program)
+        self.store(interpreter, key, bytecode)
+        return bytecode
+
+    def load(self, interpreter, key): # None when it is not cached, or the file is stale or broken
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if (size <= len(self.MAGIC) + 32):
+                    raise ValueError("truncated cache file")
+                with mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as data:
+                    if (data[:len(self.MAGIC)] != self.MAGIC):
+                        raise ValueError("not a cache file")
+                    digest = data[len(self.MAGIC):len(self.MAGIC) + 32]
+                    payload = memoryview(data)[len(self.MAGIC) + 32:]
+                    try:
+                        if (hashlib.sha256(payload).digest() != digest): # torn or corrupted write
+                            raise ValueError("cache file checksum mismatch")
+                        bytecode = interpreter.load_bytecode(payload)
+                    finally:
+                        payload.release()
+            os.utime(path) # mtime is the last use, for the LRU
+            return bytecode
+        except FileNotFoundError:
+            return None
+        except (ValueError, EOFError, TypeError, OSError): # stale or broken, removed so it is compiled again
+            self.remove(path)
+            return None
+
+    def store(self, interpreter, key, bytecode):
+        payload = interpreter.dump_bytecode(bytecode)
+        fd, temp = tempfile.mkstemp(dir = self.directory_, suffix = ".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.MAGIC)
+                f.write(hashlib.sha256(payload).digest())
+                f.write(payload)
+            os.replace(temp, self.path(key)) # readers see the old file or the whole new one, never part of it
+        except OSError:
+            self.remove(temp)
+            return
+        self.evict()
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except OSError: # already gone, e.g. removed by another process
+            pass
+
+    def entries(self): # (last use, size, path) of each cache file, least recently used first
+        entries = []
+        for name in os.listdir(self.directory_):
+            if (not name.endswith(self.SUFFIX)):
+                continue
+            path = os.path.join(self.directory_, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def evict(self): # remove the least recently used files until the cache fits its bounds
+        entries = self.entries()
+        total = sum(entry[1] for entry in entries)
+        count = len(entries)
+        for last_use, size, path in entries:
+            if (total <= self.max_bytes_ and (self.max_entries_ == None or count <= self.max_entries_)):
+                break
+            self.remove(path)
+            total -= size
+            count -= 1
+
+    def clear(self):
+        for last_use, size, path in self.entries():
+            self.remove(path)
@@ -1,15 +1,40 @@
 from intbase import InterpreterBase
 from intbase import ErrorType
+from profiler import Profiler
 import re
+import operator
+import sys
+import marshal
 
 class Interpreter(InterpreterBase):
     operators = ["+", "-", "*", "/", "%", "<", ">", "<=", ">=", "!=", "==", "&", "|"]
+    IDENTIFIER_TOK = "identifier"
+    INT_TOK = "int literal"
+    STRING_TOK = "string literal"
+    BOOL_TOK = "bool literal"
+    OPERATOR_TOK = "operator"
+    token_re_ = re.compile(r'#|(?:"[^"]*"?|[^\s"#])+') # a comment, or a token where quoted runs may hold spaces and '#'
     param_def_ = ["int", "string", "bool"]
     param_ref_def_ = ["refint", "refstring", "refbool"]
     return_def_ = ["int", "string", "bool", "void"]
-
-    def __init__(self, console_output = True, input = None, trace_output = False):
+    BYTECODE_VERSION = 1 # bump whenever the compiled form changes 
+    block_def_ = {"func": "endfunc", "while": "endwhile", "if": "endif"} # block keyword to its closing keyword
+    no_args_def_ = ["endwhile", "endfunc"] # statements whose method takes no args 
+    string_op_def_ = {"+": operator.add, "<": operator.lt, ">": operator.gt, "<=": operator.le, ">=": operator.ge, "!=": operator.ne, "==": operator.eq} # operator to its function on strings 
+    int_op_def_ = {"+": operator.add, "-": operator.sub, "*": operator.mul, "/": operator.floordiv, "%": operator.mod, "<": operator.lt,
+                   ">": operator.gt, "<=": operator.le, ">=": operator.ge, "!=": operator.ne, "==": operator.eq} # operator to its function on ints 
+    CELL_BYTES = 64 # approximate size of a var, for the heap limit 
+    bool_op_def_ = {"!=": operator.ne, "==": operator.eq, "&": operator.and_, "|": operator.or_} # operator to its function on bools 
+
+    def __init__(self, console_output = True, input = None, trace_output = False, output_sink = None, input_source = None, sampler = None, budget = None, cache = None):
         super().__init__(console_output, input)
+        self.output_sink_ = output_sink # OutputSink from streams that printed lines go to, or None for the base's output log 
+        self.input_source_ = input_source # InputSource from streams that input lines come from, or None for the input list 
+        self.trace_output_ = trace_output # True profiles each run into a table on stderr, a file name profiles it into JSON there 
+        self.profiler_ = None # Profiler of the last run, None when not profiling 
+        self.sampler_ = sampler # Sampler from profiler that snapshots the call stack of each run, or None 
+        self.budget_ = budget # Budget from budget that limits and meters each run, or None 
+        self.cache_ = cache # ProgramCache from cache that keeps compiled programs on disk, or None to compile every run 
         self.program_statements_ = []
         self.ip_ = 0
         self.terminated_ = True
@@ -18,11 +43,33 @@ class Interpreter(InterpreterBase):
         self.results_ = None # string result
         self.func_dict_ = {} # func name to line number 
         self.funccall_stack_ = [] # stack for funccalls (store ip and func name)
-        self.while_stack_ = [] # stack for while loops
+        self.block_table_ = {} # line num of block keyword to line num of its matching keyword
+        self.code_ = [] # handler and args of each line, picked once before the program runs 
+        self.builtin_def_ = {self.PRINT_DEF: self.print_def, self.STRTOINT_DEF: self.strtoint_def, self.INPUT_DEF: self.input_def} # builtin func name to the method running it 
+        self.statement_def_ = {self.FUNC_DEF: self.func_def, self.FUNCCALL_DEF: self.funccall_def, self.ASSIGN_DEF: self.assign_def,
+                               self.WHILE_DEF: self.while_def, self.ENDWHILE_DEF: self.endwhile_def, self.IF_DEF: self.if_def,
+                               self.ELSE_DEF: self.else_def, self.ENDIF_DEF: self.endif_def, self.RETURN_DEF: self.return_def,
+                               self.ENDFUNC_DEF: self.endfunc_def, self.VAR_DEF: self.var_def} # statement keyword to the method running it 
         self.return_type_stack_ = [] # stack for return types 
         self.current_func_ = None # current function name 
         self.scope_stack_ = []
 
+    def reset_all_variables(self): # state of a new interpreter, so an instance can run program after program 
+        self.program_statements_ = []
+        self.ip_ = 0
+        self.terminated_ = True
+        self.profiler_ = None
+        self.resulti_ = None
+        self.resultb_ = None
+        self.results_ = None
+        self.func_dict_ = {}
+        self.funccall_stack_.clear()
+        self.block_table_ = {}
+        self.code_ = []
+        self.return_type_stack_.clear()
+        self.current_func_ = None
+        self.scope_stack_.clear()
+
     def index_of_func(self, func_name):
         for index, elem in reversed(list(enumerate(self.scope_stack_))):
             if (elem[0] == func_name):
@@ -51,42 +98,66 @@ class Interpreter(InterpreterBase):
             scope -= 1
         return 
 
-    def filter_out_comments(self, p):
-        if (p[0] != '"'): # comment directly follows a var or int 
-            return p.index("#")
-        else: # comment directly follows a string 
-            double_quote_count = p.count('"') # count the number of double quotes 
-            if (double_quote_count == 2):
-                if (p[len(p)-1] == '"'): # if == 2 and ends with ", it is just a string expression
-                    return len(p)
-                quote_end_index = p.find('"', 1)
-                ind_to_slice = p.find('#', quote_end_index)
-                return ind_to_slice
-            else:
-                return p.index("#")
+    def token_kind(self, text):
+        if (text[0] == '"'):
+            return self.STRING_TOK
+        elif (text == "True" or text == "False"):
+            return self.BOOL_TOK
+        elif (text in self.operators):
+            return self.OPERATOR_TOK
+        elif (self.check_if_int(text)):
+            return self.INT_TOK
+        return self.IDENTIFIER_TOK
+
+    def lex(self, program, kinds = None): # yields line num and the (kind, text, column) tokens of each line
+        if (kinds == None):
+            kinds = {} # kind of each distinct token text, so repeated names and literals are only classified once 
+        for ind, line in enumerate(program):
+            tokens = []
+            for match in self.token_re_.finditer(line):
+                text = match.group()
+                if (text == "#"): # rest of the line is a comment 
+                    break
+                kind = kinds.get(text)
+                if (kind == None):
+                    kind = kinds[text] = self.token_kind(text)
+                tokens.append((kind, text, match.start()))
+            yield ind, tokens
 
     def tokenize(self, program):
-        for ind, p in enumerate(program):
-            split_p = re.split('[ ](?=(?:[^"]*"[^"]*")*[^"]*$)', p.strip())
-            split_p = [i for i in split_p if i]
-            for index, elem in enumerate(split_p): # get rid of comments in same line as code 
-                if (elem != ""):
-                    if (elem == "#" or elem[0] == "#"): 
-                        split_p = split_p[:index]
-                        continue 
-                    elif ("#" in elem): # '#' is somewhere 
-                        comment_index = self.filter_out_comments(elem)
-                        if (comment_index == len(elem)): # the elem is valid so move on to the next one 
-                            continue 
-                        new_elem = elem[:comment_index]
-                        split_p = split_p[:index]
-                        split_p.append(new_elem)
+        for ind, tokens in self.lex(program):
+            split_p = [token[1] for token in tokens]
             if (len(split_p) > 0):
                 if (split_p[0] == "func"):
                     self.func_dict_[split_p[1]] = ind
             self.program_statements_.append(split_p)
         return self.program_statements_
 
+    def build_block_table(self):
+        open_blocks = [] # stack of [keyword, line num of opener, line num of else] for unclosed blocks
+        close_def_ = {end: start for start, end in self.block_def_.items()}
+        for ind, p in enumerate(self.program_statements_):
+            if (len(p) == 0):
+                continue
+            elif (p[0] in self.block_def_):
+                open_blocks.append([p[0], ind, None])
+            elif (p[0] == self.ELSE_DEF):
+                if (not open_blocks or open_blocks[-1][0] != self.IF_DEF or open_blocks[-1][2] != None): # else outside of an if or second else 
+                    super().error(ErrorType.SYNTAX_ERROR, line_num = ind)
+                open_blocks[-1][2] = ind
+                self.block_table_[open_blocks[-1][1]] = ind # if jumps to its else 
+            elif (p[0] in close_def_):
+                if (not open_blocks or open_blocks[-1][0] != close_def_[p[0]]): # closing keyword does not match the innermost block 
+                    super().error(ErrorType.SYNTAX_ERROR, line_num = ind)
+                block = open_blocks.pop()
+                if (block[2] != None): # else jumps to its endif 
+                    self.block_table_[block[2]] = ind
+                else: 
+                    self.block_table_[block[1]] = ind
+                self.block_table_[ind] = block[1] # closing keyword jumps back to its opener 
+        if (open_blocks): # block never closed 
+            super().error(ErrorType.SYNTAX_ERROR, line_num = open_blocks[-1][1])
+
     def func_def(self, p):
         if (p[1] == "main"):
             return 
@@ -106,6 +177,9 @@ class Interpreter(InterpreterBase):
             return True
         return False
 
+    def parse_bool(self, s): # bool value of "True"/"False" text, no eval needed
+        return s == True or s == "True"
+
     def check_type(self, s):
         if (isinstance(s, bool)):
             return self.BOOL_DEF
@@ -194,77 +268,82 @@ class Interpreter(InterpreterBase):
             func_def_ = self.program_statements_[func_index]
             self.funccall_stack_.append([self.ip_+1, self.current_func_])
             self.parse_func_def(func_def_, p)
+            if (self.profiler_ != None): # args are bound, so the call happens 
+                self.profiler_.enter(func_name)
+            if (self.budget_ != None):
+                self.budget_.call(self.ip_)
             self.ip_ = self.jump_from_return(func_index)
             self.current_func_ = func_name # change func name for the dict 
 
     def funccall_def(self, p):
-        output = ""
-        if (p[1] == self.PRINT_DEF):
-            for token in p[2:]:
-                if (self.is_in_scope(token)): # token is in scope 
-                    scope = self.get_scope(token)
-                    var_scope = self.scope_stack_[-1][1][scope]
-                    if (var_scope[token][1] == self.STRING_DEF):
-                        output += var_scope[token][0].strip('\"')
-                    else: 
-                        output += str(var_scope[token][0])
-                elif (self.check_type(token) != self.INT_DEF and self.check_type(token) != self.STRING_DEF and self.check_type(token) != self.BOOL_DEF):
-                    super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
-                else:
-                    output += token.strip('\"')
-            super().output(output) 
+        self.builtin_def_.get(p[1], self.funccall_user_def)(p) # builtin, or a user defined function 
 
-        elif (p[1] == self.STRTOINT_DEF):
-            if (self.is_in_scope(p[2])):
-                scope = self.get_scope(p[2])
+    def print_def(self, p):
+        output = ""
+        for token in p[2:]:
+            if (self.is_in_scope(token)): # token is in scope 
+                scope = self.get_scope(token)
                 var_scope = self.scope_stack_[-1][1][scope]
-                if (var_scope[p[2]][1] == self.STRING_DEF):
-                    self.resulti_ = int(var_scope[p[2]][0].strip('\"'))
-                    self.scope_stack_[-1][1][0]["resulti"] = [self.resulti_, self.INT_DEF] # add to current func
-                    if (self.funccall_stack_): # add to caller func
-                        func_name = self.funccall_stack_[-1][1]
-                        ind = self.index_of_func(func_name)
-                        self.scope_stack_[ind][1][0]["resulti"] = [self.resulti_, self.INT_DEF]     
-                else:
-                    super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
+                if (var_scope[token][1] == self.STRING_DEF):
+                    output += var_scope[token][0].strip('\"')
+                else: 
+                    output += str(var_scope[token][0])
+            elif (self.check_type(token) != self.INT_DEF and self.check_type(token) != self.STRING_DEF and self.check_type(token) != self.BOOL_DEF):
+                super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
             else:
-                if (p[2][0] == '"'):
-                    self.resulti_ = int(p[2].strip('\"'))
-                    self.scope_stack_[-1][1][0]["resulti"] = [self.resulti_, self.INT_DEF] # add to current func
-                    if (self.funccall_stack_): # add to caller func
-                        func_name = self.funccall_stack_[-1][1]
-                        ind = self.index_of_func(func_name)
-                        self.scope_stack_[ind][1][0]["resulti"] = [self.resulti_, self.INT_DEF] 
-                else:
-                    super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
+                output += token.strip('\"')
+        self.output(output)
+
+    def strtoint_def(self, p):
+        if (self.is_in_scope(p[2])):
+            scope = self.get_scope(p[2])
+            var_scope = self.scope_stack_[-1][1][scope]
+            if (var_scope[p[2]][1] == self.STRING_DEF):
+                self.resulti_ = int(var_scope[p[2]][0].strip('\"'))
+                self.scope_stack_[-1][1][0]["resulti"] = [self.resulti_, self.INT_DEF] # add to current func
+                if (self.funccall_stack_): # add to caller func
+                    func_name = self.funccall_stack_[-1][1]
+                    ind = self.index_of_func(func_name)
+                    self.scope_stack_[ind][1][0]["resulti"] = [self.resulti_, self.INT_DEF]     
+            else:
+                super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
+        else:
+            if (p[2][0] == '"'):
+                self.resulti_ = int(p[2].strip('\"'))
+                self.scope_stack_[-1][1][0]["resulti"] = [self.resulti_, self.INT_DEF] # add to current func
+                if (self.funccall_stack_): # add to caller func
+                    func_name = self.funccall_stack_[-1][1]
+                    ind = self.index_of_func(func_name)
+                    self.scope_stack_[ind][1][0]["resulti"] = [self.resulti_, self.INT_DEF] 
+            else:
+                super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
 
-        elif (p[1] == self.INPUT_DEF):
-            for token in p[2:]:
-                if (self.is_in_scope(token)): # token is in scope 
-                    scope = self.get_scope(token)
-                    var_scope = self.scope_stack_[-1][1][scope]
-                    if (var_scope[token][1] == self.STRING_DEF):
-                        output += var_scope[token][0].strip('\"')
-                    else: 
-                        output += str(var_scope[token][0])
-                elif (self.check_type(token) != self.INT_DEF and self.check_type(token) != self.STRING_DEF and self.check_type(token) != self.BOOL_DEF):
-                    super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
+    def input_def(self, p):
+        output = ""
+        for token in p[2:]:
+            if (self.is_in_scope(token)): # token is in scope 
+                scope = self.get_scope(token)
+                var_scope = self.scope_stack_[-1][1][scope]
+                if (var_scope[token][1] == self.STRING_DEF):
+                    output += var_scope[token][0].strip('\"')
+                else: 
+                    output += str(var_scope[token][0])
+            elif (self.check_type(token) != self.INT_DEF and self.check_type(token) != self.STRING_DEF and self.check_type(token) != self.BOOL_DEF):
+                super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
+            else:
+                if (isinstance(token, str)):
+                    output += token.strip('\"')
                 else:
-                    if (isinstance(token, str)):
-                        output += token.strip('\"')
-                    else:
-                        output += str(token)
-            super().output(output) 
-            res = super().get_input()
-            self.results_ = '"' + res + '"'
-            self.scope_stack_[-1][1][0]["results"] = [self.results_, self.STRING_DEF] # add to current func
-            if (self.funccall_stack_): # add to caller func
-                func_name = self.funccall_stack_[-1][1]
-                ind = self.index_of_func(func_name)
-                self.scope_stack_[ind][1][0]["results"] = [self.results_, self.STRING_DEF]     
-
-        else:  
-            self.funccall_user_def(p)
+                    output += str(token)
+        self.output(output)
+        self.flush_output() # the prompt shows before waiting for input 
+        res = self.get_input()
+        self.results_ = '"' + res + '"'
+        self.scope_stack_[-1][1][0]["results"] = [self.results_, self.STRING_DEF] # add to current func
+        if (self.funccall_stack_): # add to caller func
+            func_name = self.funccall_stack_[-1][1]
+            ind = self.index_of_func(func_name)
+            self.scope_stack_[ind][1][0]["results"] = [self.results_, self.STRING_DEF]
 
     def evaluate_string_exp(self, v1, v2, i):
         if (self.is_in_scope(v1)):
@@ -275,22 +354,10 @@ class Interpreter(InterpreterBase):
             v2 =  self.scope_stack_[-1][1][scope_v2][v2][0]
         v1 = v1.strip('\"')
         v2 = v2.strip('\"')
-        if (i == '+'):
-            return v1 + v2
-        elif (i == '<'):
-            return v1 < v2
-        elif (i == '>'):
-            return v1 > v2
-        elif (i == '<='):
-            return v1 <= v2
-        elif (i == '>='):
-            return v1 >= v2
-        elif (i == '!='):
-            return v1 != v2
-        elif (i == '=='):
-            return v1 == v2
-        else:
+        func = self.string_op_def_.get(i)
+        if (func == None): # operator not defined for strings 
             super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
+        return func(v1, v2)
 
     def evaluate_int_exp(self, v1, v2, i):
         if (self.is_in_scope(v1)):
@@ -301,30 +368,10 @@ class Interpreter(InterpreterBase):
             v2 =  self.scope_stack_[-1][1][scope_v2][v2][0]
         v1 = int(v1)
         v2 = int(v2)
-        if (i == '+'):
-            return v1 + v2
-        elif (i == '-'):
-            return v1 - v2
-        elif (i == '*'):
-            return v1 * v2
-        elif (i == '/'):
-            return v1 // v2
-        elif (i == '%'):
-            return v1 % v2
-        elif (i == '<'):
-            return v1 < v2
-        elif (i == '>'):
-            return v1 > v2
-        elif (i == '<='):
-            return v1 <= v2
-        elif (i == '>='):
-            return v1 >= v2
-        elif (i == '!='):
-            return v1 != v2
-        elif (i == '=='):
-            return v1 == v2
-        else:
+        func = self.int_op_def_.get(i)
+        if (func == None): # operator not defined for ints 
             super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
+        return func(v1, v2)
 
     def evaluate_bool_exp(self, v1, v2, i): 
         if (self.is_in_scope(v1)):
@@ -334,19 +381,13 @@ class Interpreter(InterpreterBase):
             scope_v2 = self.get_scope(v2)
             v2 =  self.scope_stack_[-1][1][scope_v2][v2][0]
         if (v1 != True and v1 != False):
-            v1 = eval(v1)
+            v1 = self.parse_bool(v1)
         if (v2 != True and v2 != False):
-            v2 = eval(v2)
-        if (i == '!='):
-            return v1 != v2
-        elif (i == '=='):
-            return v1 == v2
-        elif (i == '&'):
-            return v1 & v2
-        elif (i == '|'):
-            return v1 | v2 
-        else:
+            v2 = self.parse_bool(v2)
+        func = self.bool_op_def_.get(i)
+        if (func == None): # operator not defined for bools 
             super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
+        return func(v1, v2)
 
     def evaluate_expression(self, exp): # takes in expression list 
         stack = []
@@ -416,38 +457,24 @@ class Interpreter(InterpreterBase):
                 super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
 
     def locate_endwhile(self):
-        while_count = 0
-        endwhile_count = 0
-        for index, p in enumerate(self.program_statements_[self.ip_+1:]): # go through program and find corresponding while/endwhile 
-            if (len(p) == 0):
-                continue 
-            elif (p[0] == "while"):
-                while_count += 1
-            elif (p[0] == "endwhile"):
-                if (while_count == endwhile_count):
-                    return self.ip_ + index
-                endwhile_count += 1
-
-    def handle_while_loop(self):
-        self.while_stack_.append(self.ip_)
+        return self.block_table_[self.ip_] - 1
 
     def while_def(self, p):
         expression = p[1:]
-        scope = self.get_current_scope()
-        scope_dict = self.scope_stack_[-1][1][scope]
         if (len(expression) == 1): # constant passed in 
             if (self.check_type(p[1]) != self.BOOL_DEF): # int or string passed in 
                 super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
                 return 
             else:
-                if (p[1] in scope_dict):
-                    if (scope_dict[p[1]][0] != True and scope_dict[p[1]][0] != False):
-                        result = eval(scope_dict[p[1]][0])
+                if (self.is_in_scope(p[1])): # var of this block or an enclosing one 
+                    value = self.scope_stack_[-1][1][self.get_scope(p[1])][p[1]][0]
+                    if (value != True and value != False):
+                        result = self.parse_bool(value)
                     else:
-                        result = scope_dict[p[1]][0]
+                        result = value
                 else:
                     if (p[1] != True and p[1] != False):
-                        result = eval(p[1])
+                        result = self.parse_bool(p[1])
                     else:
                         result = p[1]
         else:
@@ -457,52 +484,39 @@ class Interpreter(InterpreterBase):
             return 
         if (result == True or result == "True"): # go into the while loop
             self.scope_stack_[-1][1].append({}) # create new scope for while
-            self.handle_while_loop()
             return 
         if (result == False or result == "False"): # condition was not met 
             self.ip_ = self.locate_endwhile() + 1
             return 
 
     def endwhile_def(self):
-        if (self.while_stack_):
-            while_ip = self.while_stack_.pop() # retrieve corresponding while statement
-            self.ip_ = self.jump_from_return(while_ip)
-            self.scope_stack_[-1][1].pop()
-            return
+        while_ip = self.block_table_[self.ip_] # retrieve corresponding while statement
+        self.ip_ = self.jump_from_return(while_ip)
+        self.scope_stack_[-1][1].pop()
+        return
 
     def locate_else_endif(self):
-        if_count = 0
-        endif_count = 0
-        for index, p in enumerate(self.program_statements_[self.ip_+1:]): # go through program and find corresponding else/endif
-            if (len(p) == 0):
-                continue
-            elif (p[0] == "if"):
-                if_count += 1
-            elif (p[0] == "else"):
-                if (if_count == endif_count):
-                    return self.ip_ + index + 1
-            elif (p[0] == "endif"):
-                if (if_count == endif_count): # we found the matching endif
-                    return self.ip_ + index 
-                endif_count += 1
+        index = self.block_table_[self.ip_]
+        if (self.program_statements_[index][0] == self.ELSE_DEF):
+            return index
+        return index - 1 # land right before endif so it closes the scope
 
     def if_def(self, p):
         expression = p[1:]
-        scope = self.get_current_scope()
-        scope_dict = self.scope_stack_[-1][1][scope]
         if (len(expression) == 1): # constant is passed in 
             if (self.check_type(p[1]) != self.BOOL_DEF): # int or string passed in 
                 super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
                 return 
             else: 
-                if (p[1] in scope_dict):
-                    if (scope_dict[p[1]][0] != True and scope_dict[p[1]][0] != False):
-                        result = eval(scope_dict[p[1]][0])
+                if (self.is_in_scope(p[1])): # var of this block or an enclosing one 
+                    value = self.scope_stack_[-1][1][self.get_scope(p[1])][p[1]][0]
+                    if (value != True and value != False):
+                        result = self.parse_bool(value)
                     else:
-                        result = scope_dict[p[1]][0]
+                        result = value
                 else:
                     if (p[1] != True and p[1] != False):
-                        result = eval(p[1])
+                        result = self.parse_bool(p[1])
                     else:
                         result = p[1]
 
@@ -537,6 +551,10 @@ class Interpreter(InterpreterBase):
             return
 
         item = self.funccall_stack_.pop()
+        if (self.profiler_ != None):
+            self.profiler_.leave()
+        if (self.budget_ != None):
+            self.budget_.ret()
         recent_ip = item[0]
         caller_func = item[1]
         if (self.return_type_stack_): # not in main
@@ -622,6 +640,10 @@ class Interpreter(InterpreterBase):
     def endfunc_def(self):
         if (self.funccall_stack_):
             item = self.funccall_stack_.pop()
+            if (self.profiler_ != None):
+                self.profiler_.leave()
+            if (self.budget_ != None):
+                self.budget_.ret()
             recent_ip = item[0]
             caller_func = item[1]
             ind_caller_func = self.index_of_func(caller_func)
@@ -687,60 +709,178 @@ class Interpreter(InterpreterBase):
         else:
             super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
                 
-    def interpret_statement(self): 
-        p = self.program_statements_[self.ip_]
-        if (p != []): # not an empty line
-            if (p[0] == self.FUNC_DEF): # either main or user defined function 
-                self.func_def(p)
-            
-            elif (p[0] == self.FUNCCALL_DEF): # calling another function 
-                self.funccall_def(p)
-
-            elif (p[0] == self.ASSIGN_DEF): # assigning a variable to a value 
-                self.assign_def(p)
-
-            elif (p[0] == self.WHILE_DEF): # handle control flow 
-                self.while_def(p)
-
-            elif (p[0] == self.ENDWHILE_DEF): # end of control flow
-                self.endwhile_def()
-
-            elif (p[0] == self.IF_DEF): 
-                self.if_def(p)
-
-            elif (p[0] == self.ELSE_DEF): 
-                self.else_def(p)
-
-            elif (p[0] == self.ENDIF_DEF): 
-                self.endif_def(p)
-
-            elif (p[0] == self.RETURN_DEF): # return statement
-                self.return_def(p)
+    def decode(self, p): # handler of a statement and the args it is called with 
+        if (p == []): # empty line
+            return (self.nop, ())
+        if (p[0] == self.FUNCCALL_DEF and len(p) > 1 and p[1] in self.builtin_def_):
+            return (self.builtin_def_[p[1]], (p,))
+        handler = self.statement_def_.get(p[0])
+        if (handler == None): # not a statement, skipped 
+            return (self.nop, ())
+        if (p[0] in self.no_args_def_):
+            return (handler, ())
+        return (handler, (p,))
+
+    def nop(self):
+        return
 
-            elif (p[0] == self.ENDFUNC_DEF): # end of function
-                self.endfunc_def()
+    def interpret_statement(self): 
+        handler, args = self.code_[self.ip_]
+        handler(*args)
+        return self.ip_ + 1
+
+    def instrumented_statements(self): # the run loop with whichever of the budget, profiler and step sampler are set 
+        budget = self.budget_
+        profiler = self.profiler_
+        sampler = self.sampler_ if (self.sampler_ != None and self.sampler_.every_ != None) else None # a timer sampler needs no hook 
+        allocates = self.allocations() if (budget != None) else None
+        check = budget.next_check() if (budget != None) else None
+        countdown = sampler.every_ if (sampler != None) else None
+        steps = 0
+        allocations = 0
+        try:
+            while (not self.terminated_):
+                ip = self.ip_
+                if (budget != None):
+                    steps += 1
+                    allocations += allocates[ip]
+                    if (steps >= check):
+                        budget.steps_ = steps
+                        check = budget.check(self)
+                if (sampler != None):
+                    countdown -= 1
+                    if (countdown == 0):
+                        sampler.sample(self)
+                        countdown = sampler.every_
+                if (profiler != None):
+                    profiler.begin(ip)
+                    ip = self.interpret_statement()
+                    profiler.end()
+                else:
+                    ip = self.interpret_statement()
+                self.ip_ = ip
+        finally:
+            if (budget != None):
+                budget.steps_ = steps
+                budget.line_allocations_ = allocations
+
+    def call_stack(self): # (func name, line num) of each call in progress, main first, for the sampler 
+        stack = [(item[1], item[0] - 1) for item in self.funccall_stack_] # each caller is at its funccall line 
+        stack.append((self.current_func_, self.ip_))
+        return stack
+
+    def allocations(self): # vars each line makes, for metering 
+        return [len(p) - 2 if (p and p[0] == self.VAR_DEF) else 0 for p in self.program_statements_]
+
+    def heap_size(self): # approximate bytes held by the vars of every func 
+        size = 0
+        for func in self.scope_stack_:
+            for scope in func[1]:
+                for var in scope.values():
+                    size += self.CELL_BYTES
+                    if (isinstance(var[0], str)):
+                        size += len(var[0])
+                    elif (isinstance(var[0], int)): # ints grow without bound too 
+                        size += var[0].bit_length() // 8
+        return size
+
+    def guard_operators(self): # with a heap limit, string + and int * check there is room for their result before making it 
+        self.string_op_def_ = type(self).string_op_def_
+        self.int_op_def_ = type(self).int_op_def_
+        if (self.budget_ != None and self.budget_.max_heap_ != None):
+            self.string_op_def_ = dict(self.string_op_def_)
+            self.string_op_def_["+"] = self.budget_.guard(self, operator.add, self.budget_.concat_size)
+            self.int_op_def_ = dict(self.int_op_def_)
+            self.int_op_def_["*"] = self.budget_.guard(self, operator.mul, self.budget_.product_size)
+
+    def output(self, v):
+        if (self.output_sink_ != None):
+            self.output_sink_.write(v)
+        else:
+            super().output(v)
 
-            elif (p[0] == self.VAR_DEF): # variable definition
-                self.var_def(p)
+    def flush_output(self): # lines still buffered in the sink are written out 
+        if (self.output_sink_ != None):
+            self.output_sink_.flush()
 
-        new_ip = self.ip_ + 1
-        return new_ip
+    def get_input(self):
+        if (self.input_source_ != None):
+            line = self.input_source_.readline()
+        else:
+            line = super().get_input()
+        if (line == None): # every input line was read 
+            super().error(ErrorType.FAULT_ERROR, line_num = self.ip_)
+        return line
+
+    def write_profile(self): # report of the run, as a table on stderr or as JSON in the file trace_output names 
+        self.profiler_.finish()
+        if (isinstance(self.trace_output_, str)):
+            with open(self.trace_output_, "w") as f:
+                f.write(self.profiler_.to_json())
+        else:
+            sys.stderr.write(self.profiler_.table())
 
     def locate_main(self):
         self.ip_ = self.func_dict_["main"]
         return self.ip_
 
+    def compile(self, program): # tokens of each line with the func and block tables, plain lists and dicts so it can be cached 
+        self.reset_all_variables()
+        self.program_statements_ = self.tokenize(program)
+        self.build_block_table()
+        return (self.BYTECODE_VERSION, self.program_statements_, self.block_table_, self.func_dict_)
+
+    def dump_bytecode(self, bytecode):
+        return marshal.dumps(bytecode)
+
+    def load_bytecode(self, data):
+        bytecode = marshal.loads(data)
+        if (bytecode[0] != self.BYTECODE_VERSION): # compiled by another version of the interpreter 
+            raise ValueError("bytecode version " + str(bytecode[0]) + " is not " + str(self.BYTECODE_VERSION))
+        return bytecode
+
     # program is an array of strings 
     def run(self, program):
-        self.program_statements_ = self.tokenize(program)
+        if (self.cache_ != None): # compiled by an earlier run, or by another process sharing the cache 
+            self.reset_all_variables()
+            self.run_bytecode(self.cache_.bytecode(self, program))
+        else:
+            self.run_bytecode(self.compile(program))
+
+    def run_bytecode(self, bytecode):
+        self.reset_all_variables()
+        self.program_statements_ = bytecode[1]
+        self.block_table_ = bytecode[2]
+        self.func_dict_ = dict(bytecode[3]) # the compiled form may be run again, so it is never changed 
+        self.code_ = [self.decode(p) for p in self.program_statements_] # bind each line to its handler 
+        self.guard_operators()
         self.ip_ = self.locate_main()
         self.func_dict_["main"] = self.ip_
         self.current_func_ = "main"
         self.scope_stack_.append([self.current_func_, []]) # create new stack entry for main
         self.scope_stack_[0][1].append({}) # create var dict for main
         self.terminated_ = False
-
-        while (not self.terminated_):
-            self.ip_ = self.interpret_statement()
+        if (self.trace_output_):
+            self.profiler_ = Profiler(self.program_statements_)
+            self.profiler_.enter("main")
+        if (self.sampler_ != None):
+            self.sampler_.start(self)
+        if (self.budget_ != None):
+            self.budget_.start()
+
+        try:
+            if (self.budget_ != None or self.profiler_ != None or (self.sampler_ != None and self.sampler_.every_ != None)): # a separate loop, so plain runs pay nothing for the hooks 
+                self.instrumented_statements()
+            else:
+                while (not self.terminated_):
+                    self.ip_ = self.interpret_statement()
+        finally: # output printed before an error is not lost 
+            self.flush_output()
+            if (self.profiler_ != None):
+                self.write_profile()
+            if (self.sampler_ != None):
+                self.sampler_.stop()
+            if (self.budget_ != None):
+                self.budget_.finish(self)
 
 
@@ -1,120 +1,247 @@
 from intbase import InterpreterBase
 from intbase import ErrorType
+from profiler import Profiler
 import re
 import copy
+import operator
+import marshal
+import sys
+
+class Value: # a typed value, and the cell a var, member or ref param shares 
+    __slots__ = ("value_", "type_")
+
+    def __init__(self, value, type_):
+        self.value_ = value
+        self.type_ = type_
+
+class Shape: # member layout shared by every object that got the same members in the same order 
+    __slots__ = ("slots_", "next_")
+
+    def __init__(self, slots):
+        self.slots_ = slots # member name to its index in the object's cells 
+        self.next_ = {} # member name to the shape an object moves to when the member is added 
+
+    def add(self, name):
+        shape = self.next_.get(name)
+        if (shape == None):
+            slots = dict(self.slots_)
+            slots[name] = len(slots)
+            shape = Shape(slots)
+            self.next_[name] = shape
+        return shape
+
+    def __deepcopy__(self, memo): # shapes never change, copies of an object keep its shape 
+        return self
+
+class Object: # a Brewin object, the cells of its members in the order its shape gives them 
+    __slots__ = ("shape_", "cells_")
+
+    def __init__(self, shape):
+        self.shape_ = shape
+        self.cells_ = []
+
+class Signature: # a func or lambda header parsed once, everything a call checks and binds 
+    __slots__ = ("name_", "arity_", "names_", "types_", "kinds_", "slots_", "return_type_", "size_", "captures_", "valid_")
+
+    def __init__(self, name, params, return_type_, slots, size, captures, valid):
+        self.name_ = name # func name, or "lambda"
+        self.arity_ = len(params)
+        self.names_ = tuple([param[0] for param in params])
+        self.types_ = tuple([param[1] for param in params]) # type the arg must have 
+        self.kinds_ = tuple([param[2] for param in params]) # how each arg is bound, see Interpreter.VALUE_PARAM 
+        self.slots_ = slots # slot of each param in the func's first block 
+        self.return_type_ = return_type_
+        self.size_ = size # slots of the func's first block 
+        self.captures_ = captures # for lambdas, where each captured var goes 
+        self.valid_ = valid # False if the header is broken, every call fails 
+
+class Frame: # one call of a func or lambda 
+    __slots__ = ("func_name_", "blocks_", "caller_", "return_ip_", "return_type_", "return_slot_")
+
+    def __init__(self):
+        self.func_name_ = None # func name, or "lambda"
+        self.blocks_ = [] # slots of each open block of the func, innermost last 
+        self.caller_ = None # frame of the calling func, None for main 
+        self.return_ip_ = 0 # line num to resume at in the caller 
+        self.return_type_ = None
+        self.return_slot_ = None # slot of the caller's result var that gets the returned value, None for void 
+
+class CheckFailed(Exception): # a compile time check found a line that always fails once it runs 
+    def __init__(self, error_type):
+        super().__init__(error_type.name)
+        self.error_type_ = error_type
 
 class Interpreter(InterpreterBase):
     operators = ["+", "-", "*", "/", "%", "<", ">", "<=", ">=", "!=", "==", "&", "|"]
+    IDENTIFIER_TOK = "identifier"
+    INT_TOK = "int literal"
+    STRING_TOK = "string literal"
+    BOOL_TOK = "bool literal"
+    OPERATOR_TOK = "operator"
+    MEMBER_TOK = "member"
+    token_re_ = re.compile(r'#|(?:"[^"]*"?|[^\s"#])+') # a comment, or a token where quoted runs may hold spaces and '#'
     param_def_ = ["int", "string", "bool", "func"]
     param_ref_def_ = ["refint", "refstring", "refbool", "object"]
     return_def_ = ["int", "string", "bool", "void", "func", "object"]
-
-    def __init__(self, console_output = True, input = None, trace_output = False):
+    NOP_OP, ERROR_OP, FUNC_OP, VAR_OP, ASSIGN_OP, ASSIGN_EXP_OP, PRINT_OP, STRTOINT_OP, INPUT_OP, CALL_OP, RETURN_OP, ENDFUNC_OP = range(12)
+    WHILE_OP, ENDWHILE_OP, IF_OP, JUMP_OP, POP_SCOPE_OP, LAMBDA_OP, PUSH_CONST_OP, PUSH_VAR_OP, PUSH_MEMBER_OP, APPLY_OP = range(12, 22)
+    CALL_DIRECT_OP, ASSIGN_TYPED_OP, RETURN_TYPED_OP = range(22, 25) # statements the type checker proved, run without runtime checks 
+    TAIL_CALL_OP = 25 # proved call whose result the caller returns as is, the callee reuses the caller's frame 
+    INPUT_ALL_OP = 26
+    INPUT_ALL_DEF = "inputall" # builtin reading every input line left into results 
+    opcode_names_ = ["NOP", "ERROR", "FUNC", "VAR", "ASSIGN", "ASSIGN_EXP", "PRINT", "STRTOINT", "INPUT", "CALL", "RETURN", "ENDFUNC",
+                     "WHILE", "ENDWHILE", "IF", "JUMP", "POP_SCOPE", "LAMBDA", "PUSH_CONST", "PUSH_VAR", "PUSH_MEMBER", "APPLY",
+                     "CALL_DIRECT", "ASSIGN_TYPED", "RETURN_TYPED", "TAIL_CALL", "INPUT_ALL"]
+    slot_args_ = {VAR_OP: (2,), FUNC_OP: (4,), LAMBDA_OP: (4, 5), CALL_DIRECT_OP: (3,), TAIL_CALL_OP: (3,)} # operands of an instruction that are slots or flags, for the disassembler 
+    expression_args_ = {ASSIGN_EXP_OP: 2, RETURN_OP: 1, WHILE_OP: 1, IF_OP: 1, ASSIGN_TYPED_OP: 2, RETURN_TYPED_OP: 1} # operand of an instruction that is expression code 
+    FREE_FRAMES_MAX = 4096 # most returned frames kept for reuse 
+    CELL_BYTES = 64 # approximate size of a var, member or object, for the heap limit 
+    SHARE_CAPTURE, COPY_CAPTURE, DEEP_CAPTURE = range(3) # how a call gets a captured var: the captured cell itself, a new cell, or a deep copy 
+    capture_names_ = ["s", "c", "d"]
+    VALUE_PARAM, OBJECT_PARAM, REF_PARAM, INVALID_PARAM = range(4) # how an arg is bound to its param: a copy, sharing the Object, sharing the cell, or not at all 
+    BYTECODE_VERSION = 10 # bump whenever the instruction format changes 
+    block_def_ = {"func": "endfunc", "while": "endwhile", "if": "endif", "lambda": "endlambda"} # block keyword to its closing keyword
+    literal_def_ = {"int literal": "int", "string literal": "string", "bool literal": "bool"} # literal token kind to its type 
+    default_def_ = {"int": 0, "string": "", "bool": False, "func": "default", "object": None} # value of a new var, objects get a new Object 
+    result_def_ = {"int": "resulti", "string": "results", "bool": "resultb", "func": "resultf", "object": "resulto"} # return type to the var holding it 
+    slot_def_ = {"resulti": 0, "results": 1, "resultb": 2, "resultf": 3, "resulto": 4, "this": 5} # vars set at runtime, every frame has a slot for them 
+    slot_type_ = {"resulti": "int", "results": "string", "resultb": "bool", "resultf": "func", "resulto": "object", "this": "object"} # type of the vars set at runtime 
+    result_slot_ = {"int": 0, "string": 1, "bool": 2, "func": 3, "object": 4} # return type to the slot holding it 
+    op_def_ = {"+": {"int": (operator.add, "int"), "string": (operator.add, "string")}, "-": {"int": (operator.sub, "int")},
+               "*": {"int": (operator.mul, "int")}, "/": {"int": (operator.floordiv, "int")}, "%": {"int": (operator.mod, "int")},
+               "<": {"int": (operator.lt, "bool"), "string": (operator.lt, "bool")}, ">": {"int": (operator.gt, "bool"), "string": (operator.gt, "bool")},
+               "<=": {"int": (operator.le, "bool"), "string": (operator.le, "bool")}, ">=": {"int": (operator.ge, "bool"), "string": (operator.ge, "bool")},
+               "!=": {"int": (operator.ne, "bool"), "string": (operator.ne, "bool"), "bool": (operator.ne, "bool")},
+               "==": {"int": (operator.eq, "bool"), "string": (operator.eq, "bool"), "bool": (operator.eq, "bool")},
+               "&": {"bool": (operator.and_, "bool")}, "|": {"bool": (operator.or_, "bool")}} # operator to operand type to its function and result type 
+
+    def __init__(self, console_output = True, input = None, trace_output = False, output_sink = None, input_source = None, sampler = None, budget = None, cache = None):
         super().__init__(console_output, input)
+        self.output_sink_ = output_sink # OutputSink from streams that printed lines go to, or None for the base's output log 
+        self.input_source_ = input_source # InputSource from streams that input lines come from, or None for the input list 
+        self.trace_output_ = trace_output # True profiles each run into a table on stderr, a file name profiles it into JSON there 
+        self.profiler_ = None # Profiler of the last run, None when not profiling 
+        self.sampler_ = sampler # Sampler from profiler that snapshots the call stack of each run, or None 
+        self.budget_ = budget # Budget from budget that limits and meters each run, or None 
+        self.cache_ = cache # ProgramCache from cache that keeps compiled programs on disk, or None to compile every run 
         self.program_statements_ = []
         self.ip_ = 0
         self.terminated_ = True
-        self.resulti_ = None # integer result
-        self.resultb_ = None # boolean result
-        self.results_ = None # string result
-        self.resultf_ = None # function result
-        self.resulto_ = None # object result
         self.func_dict_ = {} # func name to line number 
-        self.funccall_stack_ = [] # stack for funccalls (store ip and func name)
-        self.while_stack_ = [] # stack for while loops
-        self.return_type_stack_ = [] # stack for return types 
+        self.block_table_ = {} # line num of block keyword to line num of its matching keyword
+        self.token_kinds_ = {} # token text to the kind the lexer gave it 
         self.current_func_ = None # current function name 
-        self.scope_stack_ = [] 
-        self.lambda_stack_ = [] # stack of dict of line num to captured var for lambdas 
-
-    def index_of_func(self, func_name):
-        for index, elem in reversed(list(enumerate(self.scope_stack_))):
-            if (elem[0] == func_name):
-                return index
-        return
-
-    def get_current_scope(self):
-        ind = self.index_of_func(self.current_func_)
-        return len(self.scope_stack_[ind][1])-1 # retrieve the curent scope of this function
-
-    def is_in_scope(self, var):
-        scope = self.get_current_scope()
-        ind = self.index_of_func(self.current_func_)
-
-        if ("." in var): # check if obj mem is in scope 
-            obj = var.split(".")[0]
-            mem = var.split(".")[1]
-            while (scope != -1):
-                if (obj in self.scope_stack_[ind][1][scope]):
-                    if (mem in self.scope_stack_[ind][1][scope][obj][0]):
-                        return True
-                scope -= 1
-            return False
-
-        while (scope != -1):
-            if (var in self.scope_stack_[ind][1][scope]):
-                return True
-            scope -= 1
-        return False
-
-    def get_scope(self, var):
-        scope = self.get_current_scope()
-        ind = self.index_of_func(self.current_func_)
-        if ("." in var):
-            var = var.split(".")[0]
-        while (scope != -1):
-            if (var in self.scope_stack_[ind][1][scope]):
-                return scope
-            scope -= 1
-        return 0
-
-    def filter_out_comments(self, p):
-        if (p[0] != '"'): # comment directly follows a var or int 
-            return p.index("#")
-        else: # comment directly follows a string 
-            double_quote_count = p.count('"') # count the number of double quotes 
-            if (double_quote_count == 2):
-                if (p[len(p)-1] == '"'): # if == 2 and ends with ", it is just a string expression
-                    return len(p)
-                quote_end_index = p.find('"', 1)
-                ind_to_slice = p.find('#', quote_end_index)
-                return ind_to_slice
-            else:
-                return p.index("#")
+        self.frame_ = None # frame of the running func 
+        self.free_frames_ = [] # frames of returned funcs, reused by later calls 
+        self.root_shape_ = Shape({}) # shape of objects without members, its transitions are the shapes the running program made 
+        self.bytecode_ = () # instruction for each line 
+        self.layouts_ = [] # while compiling, blocks of the enclosing funcs as [var name to slot, num of slots, line num, var name to type], the first also with the slots used and written 
+        self.captures_ = {} # while compiling, line num of a lambda to its captures, all visible vars until its body is closed 
+        self.block_size_ = {} # while compiling, line num of block keyword to num of slots its block needs
+        self.consts_ = [] # constant pool, (type, value) while compiling and a Value for each once loaded 
+        self.const_index_ = {} # while compiling, (type, value) to its index in the constant pool 
+        self.code_ = [] # handler and operands for each line 
+        self.signatures_ = [] # Signature of each func and lambda header line, None for other lines 
+        self.op_table_ = [self.nop, self.error_def, self.nop, self.var_def, self.assign_def, self.assign_exp_def, self.print_def,
+                          self.strtoint_def, self.input_def, self.funccall_def, self.return_def, self.endfunc_def, self.while_def,
+                          self.endwhile_def, self.if_def, self.jump_def, self.endif_def, self.lambda_def, None, None, None, None,
+                          self.funccall_direct_def, self.assign_typed_def, self.return_typed_def, self.tail_call_def,
+                          self.input_all_def] # opcode to the method running it 
+        self.compile_def_ = {self.FUNC_DEF: self.compile_func, self.FUNCCALL_DEF: self.compile_funccall, self.ASSIGN_DEF: self.compile_assign,
+                             self.WHILE_DEF: self.compile_while, self.ENDWHILE_DEF: self.compile_endwhile, self.IF_DEF: self.compile_if,
+                             self.ELSE_DEF: self.compile_else, self.ENDIF_DEF: self.compile_endif, self.RETURN_DEF: self.compile_return,
+                             self.ENDFUNC_DEF: self.compile_endfunc, self.VAR_DEF: self.compile_var, self.LAMBDA_DEF: self.compile_lambda,
+                             self.ENDLAMBDA_DEF: self.compile_endfunc} # statement keyword to the method lowering it 
+
+    def reset_all_variables(self): # state of a new interpreter, so an instance can run program after program, keeping the frames it can reuse 
+        self.program_statements_ = []
+        self.ip_ = 0
+        self.terminated_ = True
+        self.profiler_ = None
+        self.func_dict_ = {}
+        self.block_table_ = {}
+        self.current_func_ = None
+        self.release_frames()
+        self.bytecode_ = ()
+        self.layouts_ = []
+        self.captures_ = {}
+        self.block_size_ = {}
+        self.consts_ = []
+        self.const_index_ = {}
+        self.code_ = []
+        self.signatures_ = []
+        self.root_shape_ = Shape({})
+
+    def release_frames(self): # frames still on the stack, after main ended or an error, go back to the free list 
+        while (self.frame_ != None):
+            frame = self.frame_
+            self.frame_ = frame.caller_
+            frame.blocks_.clear()
+            frame.caller_ = None
+            if (len(self.free_frames_) < self.FREE_FRAMES_MAX):
+                self.free_frames_.append(frame)
+
+    def token_kind(self, text):
+        if (text[0] == '"'):
+            return self.STRING_TOK
+        elif (text == "True" or text == "False"):
+            return self.BOOL_TOK
+        elif (text in self.operators):
+            return self.OPERATOR_TOK
+        elif (self.check_if_int(text)):
+            return self.INT_TOK
+        elif ("." in text):
+            return self.MEMBER_TOK
+        return self.IDENTIFIER_TOK
+
+    def lex(self, program, kinds = None): # yields line num and the (kind, text, column) tokens of each line
+        if (kinds == None):
+            kinds = {} # kind of each distinct token text, so repeated names and literals are only classified once 
+        for ind, line in enumerate(program):
+            tokens = []
+            for match in self.token_re_.finditer(line):
+                text = match.group()
+                if (text == "#"): # rest of the line is a comment 
+                    break
+                kind = kinds.get(text)
+                if (kind == None):
+                    kind = kinds[text] = self.token_kind(text)
+                tokens.append((kind, text, match.start()))
+            yield ind, tokens
 
     def tokenize(self, program):
-        for ind, p in enumerate(program):
-            split_p = re.split('[ ](?=(?:[^"]*"[^"]*")*[^"]*$)', p.strip())
-            split_p = [i for i in split_p if i]
-            for index, elem in enumerate(split_p): # get rid of comments in same line as code 
-                if (elem != ""):
-                    if (elem == "#" or elem[0] == "#"): 
-                        split_p = split_p[:index]
-                        continue 
-                    elif ("#" in elem): # '#' is somewhere 
-                        comment_index = self.filter_out_comments(elem)
-                        if (comment_index == len(elem)): # the elem is valid so move on to the next one 
-                            continue 
-                        new_elem = elem[:comment_index]
-                        split_p = split_p[:index]
-                        split_p.append(new_elem)
+        for ind, tokens in self.lex(program, self.token_kinds_):
+            split_p = [token[1] for token in tokens]
             if (len(split_p) > 0):
                 if (split_p[0] == "func"):
                     self.func_dict_[split_p[1]] = ind
             self.program_statements_.append(split_p)
         return self.program_statements_
 
-    def func_def(self, p):
-        if (p[1] == "main"):
-            return 
-        else: 
-            self.func_dict_[p[1]] = self.ip_
-
-    def jump_from_return(self, index):
-        if (index == 0):
-            return 0
-        self.ip_ = index-1
-        return self.ip_
+    def build_block_table(self):
+        open_blocks = [] # stack of [keyword, line num of opener, line num of else] for unclosed blocks
+        close_def_ = {end: start for start, end in self.block_def_.items()}
+        for ind, p in enumerate(self.program_statements_):
+            if (len(p) == 0):
+                continue
+            elif (p[0] in self.block_def_):
+                open_blocks.append([p[0], ind, None])
+            elif (p[0] == self.ELSE_DEF):
+                if (not open_blocks or open_blocks[-1][0] != self.IF_DEF or open_blocks[-1][2] != None): # else outside of an if or second else 
+                    super().error(ErrorType.SYNTAX_ERROR, line_num = ind)
+                open_blocks[-1][2] = ind
+                self.block_table_[open_blocks[-1][1]] = ind # if jumps to its else 
+            elif (p[0] in close_def_):
+                if (not open_blocks or open_blocks[-1][0] != close_def_[p[0]]): # closing keyword does not match the innermost block 
+                    super().error(ErrorType.SYNTAX_ERROR, line_num = ind)
+                block = open_blocks.pop()
+                if (block[2] != None): # else jumps to its endif 
+                    self.block_table_[block[2]] = ind
+                else: 
+                    self.block_table_[block[1]] = ind
+                self.block_table_[ind] = block[1] # closing keyword jumps back to its opener 
+        if (open_blocks): # block never closed 
+            super().error(ErrorType.SYNTAX_ERROR, line_num = open_blocks[-1][1])
 
     def check_if_int(self, s):
         if (s[0] == '-'):
@@ -123,942 +250,1040 @@ class Interpreter(InterpreterBase):
             return True
         return False
 
-    def check_type(self, s):
-        if (s == "resultf"):
-            return self.FUNC_DEF
-        elif (isinstance(s, list)):
-            return self.FUNC_DEF
-        elif (isinstance(s, dict)):
-            return self.OBJECT_DEF
-        elif (isinstance(s, bool)):
-            return self.BOOL_DEF
-        elif (s == 'True' or s == 'False'):
-            return self.BOOL_DEF
-        elif (isinstance(s, int)):
-            return self.INT_DEF
-        elif (self.check_if_int(s)):
-            return self.INT_DEF
-        elif (s[0] == '"'):
-            return self.STRING_DEF
-        elif (s in self.func_dict_):
+    def compile(self, program): # lower a program (array of strings) into bytecode 
+        self.program_statements_ = []
+        self.func_dict_ = {}
+        self.block_table_ = {}
+        self.token_kinds_ = {}
+        self.program_statements_ = self.tokenize(program)
+        self.build_block_table()
+        self.layouts_ = []
+        self.block_size_ = {}
+        self.captures_ = {}
+        self.consts_ = []
+        self.const_index_ = {}
+        instructions = []
+        for ind, p in enumerate(self.program_statements_):
+            instructions.append(self.compile_statement(ind, p))
+        for ind, captures in self.captures_.items(): # lambdas only capture the vars their body uses 
+            if (instructions[ind][0] == self.LAMBDA_OP):
+                instructions[ind] = instructions[ind][:5] + (captures,)
+        for ind, size in self.block_size_.items(): # openers learn the size of their block once it is closed 
+            if (instructions[ind][0] in (self.FUNC_OP, self.LAMBDA_OP, self.WHILE_OP, self.IF_OP)):
+                instructions[ind] = instructions[ind] + (size,)
+        source = tuple([tuple(p) for p in self.program_statements_]) # tokens of each line, for reports on runs that load the bytecode 
+        return (self.BYTECODE_VERSION, tuple(instructions), dict(self.func_dict_), tuple(self.consts_), source)
+
+    def compile_statement(self, ind, p): # one instruction per line, so the ip is still the line num 
+        if (p == []): # empty line
+            return (self.NOP_OP,)
+        if (not self.layouts_ and p[0] != self.FUNC_DEF): # outside of any function, never runs 
+            return (self.NOP_OP,)
+        compiler = self.compile_def_.get(p[0])
+        if (compiler == None): # not a statement, skipped 
+            return (self.NOP_OP,)
+        try:
+            return compiler(ind, p)
+        except CheckFailed as failed: # the error is raised when the line runs, so lines that never run cannot fail the program 
+            if (p[0] == self.WHILE_DEF or p[0] == self.IF_DEF): # its closing keyword still closes the block 
+                self.open_block(ind)
+            return (self.ERROR_OP, failed.error_type_.name)
+
+    def open_frame(self, ind): # start the slot layout of a function or lambda body 
+        self.layouts_.append([[dict(self.slot_def_), len(self.slot_def_), ind, dict(self.slot_type_), set(), set()]])
+
+    def close_frame(self):
+        block = self.layouts_.pop()[0]
+        self.block_size_[block[2]] = block[1]
+        if (block[2] in self.captures_):
+            self.close_captures(block)
+
+    def close_captures(self, block): # keep the captures the lambda body used, and pick how each call gets them 
+        captures = []
+        for capture in self.captures_[block[2]]:
+            if (capture[2] not in block[4]):
+                continue
+            if (capture[3] == self.OBJECT_DEF or capture[3] == None): # members can change through any alias 
+                mode = self.DEEP_CAPTURE
+            elif (capture[2] in block[5]):
+                mode = self.COPY_CAPTURE
+            else: # only read, so every call can share one cell 
+                mode = self.SHARE_CAPTURE
+            captures.append((capture[0], capture[1], capture[2], mode))
+            if (capture[0] == 0): # the enclosing func must capture it too, if it is a lambda 
+                self.layouts_[-1][0][4].add(capture[1])
+        self.captures_[block[2]] = tuple(captures)
+
+    def open_block(self, ind):
+        self.layouts_[-1].append([{}, 0, ind, {}])
+
+    def close_block(self):
+        block = self.layouts_[-1].pop()
+        self.block_size_[block[2]] = block[1]
+
+    def declare(self, name, type_): # slot of name in the innermost block, added if it is new there 
+        block = self.layouts_[-1][-1]
+        if (name not in block[0]):
+            block[0][name] = block[1]
+            block[1] += 1
+        block[3][name] = type_
+        return block[0][name]
+
+    def declare_param(self, param):
+        param_def = param.split(":")
+        if (len(param_def) != 2): # invalid, the call reports it 
+            return self.declare(param_def[0], None)
+        if (param_def[1] in self.param_ref_def_ and param_def[1] != self.OBJECT_DEF): # a ref param holds the caller's cell 
+            return self.declare(param_def[0], param_def[1][3:])
+        return self.declare(param_def[0], param_def[1])
+
+    def resolve(self, name): # (block, slot) that name refers to in the current function, or None 
+        blocks = self.layouts_[-1]
+        depth = len(blocks) - 1
+        while (depth != -1):
+            if (name in blocks[depth][0]):
+                if (depth == 0):
+                    blocks[0][4].add(blocks[0][0][name])
+                return (depth, blocks[depth][0][name])
+            depth -= 1
+        return None
+
+    def write(self, operand): # the line may change the var's cell, so a lambda call needs a copy of it 
+        if (operand[0] == self.PUSH_VAR_OP and operand[2] == 0):
+            self.layouts_[-1][0][5].add(operand[3])
+
+    def visible_names(self): # name to (block, slot, type) of every var the current line can see 
+        names = {}
+        for depth, block in enumerate(self.layouts_[-1]):
+            for name, slot in block[0].items():
+                names[name] = (depth, slot, block[3][name])
+        return names
+
+    def static_type(self, operand): # type an operand always has when it loads, or None if only known at runtime 
+        if (operand[0] == self.PUSH_CONST_OP):
+            return self.consts_[operand[1]][0]
+        elif (operand[0] != self.PUSH_VAR_OP):
+            return None
+        elif (operand[2] == None):
             return self.FUNC_DEF
-        elif ("." in s and self.check_type(s.split(".")[0]) != self.OBJECT_DEF):
-            super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
-        elif (self.is_in_scope(s)):
-            scope = self.get_scope(s)
-            if ("." in s):
-                return self.scope_stack_[-1][1][scope][s.split(".")[0]][0][s.split(".")[1]][1]
-            var = self.scope_stack_[-1][1][scope][s]
-            return var[1]
-        else:
-            super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
-
-    def check_func_def(self, func_def, func_call):
-        return_type_ = func_def[len(func_def)-1] # extract return type 
-        if (return_type_ not in self.return_def_): # invalid return type 
-            super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
-        if (len(func_def)-len(func_call) != 1): # num of parameters do not match 
-            super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
-        def_param_ = []
-        for index, parameter in enumerate(func_def[2:-1]): # traverse through parameters
-            param_def = parameter.split(":")
-            if (param_def[0] in def_param_):
-                super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
-            else:
-                def_param_.append(param_def[0])
+        elif (operand[4] != None and operand[1] in self.slot_def_): # might be unset and fall back to the function 
+            return None
+        for block in reversed(self.layouts_[-1]):
+            if (operand[1] in block[0]):
+                return block[3][operand[1]]
+
+    def compile_operand(self, ind, token): # instruction pushing a constant, variable, member or function 
+        kind = self.token_kinds_.get(token)
+        if (kind == None): # not a token of the program text 
+            kind = self.token_kind(token)
+        if (kind == self.INT_TOK or kind == self.STRING_TOK or kind == self.BOOL_TOK):
+            return (self.PUSH_CONST_OP, self.constant(self.parse_literal(kind, token), self.literal_def_[kind]))
+        elif (kind == self.MEMBER_TOK):
+            obj = token.split(".")[0]
+            address = self.resolve(obj)
+            if (address == None): # object was never declared 
+                raise CheckFailed(ErrorType.NAME_ERROR)
+            return (self.PUSH_MEMBER_OP, obj, address[0], address[1], token.split(".")[1])
+        address = self.resolve(token)
+        func_index = self.func_dict_.get(token)
+        if (address == None and func_index == None): # neither a var nor a function 
+            raise CheckFailed(ErrorType.NAME_ERROR)
+        if (address == None):
+            return (self.PUSH_VAR_OP, token, None, None, func_index)
+        return (self.PUSH_VAR_OP, token, address[0], address[1], func_index)
+
+    def constant(self, value, type_): # index of a literal in the constant pool 
+        key = (type_, value)
+        if (key not in self.const_index_):
+            self.const_index_[key] = len(self.consts_)
+            self.consts_.append(key)
+        return self.const_index_[key]
+
+    def parse_literal(self, kind, token): # native value of a literal, so nothing is parsed at runtime 
+        if (kind == self.INT_TOK):
+            return int(token)
+        elif (kind == self.BOOL_TOK):
+            return token == "True"
+        return token.strip('\"')
+
+    def is_definite(self, operand): # loading it can never fail, so a later type error is certain 
+        if (operand[0] == self.PUSH_CONST_OP):
+            return True
+        elif (operand[0] == self.PUSH_VAR_OP):
+            return operand[2] == None or operand[1] not in self.slot_def_
+        return False
 
-    def check_param_type(self, a, b):
-        if (a not in self.param_def_ and a not in self.param_ref_def_): # invalid parameter name 
-            super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
-        if (b not in self.param_def_ and b not in self.param_ref_def_): # invalid parameter name 
-            super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
-        if (a == b):
-            return 
-        if (a[0:3] == "ref"):
-            if (a[3:] == b):
-                return 
-        if (b[0:3] == "ref"):
-            if (b[3:] == a):
-                return
-        super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
-
-    def parse_func_def(self, func_def, func_call):
-        if (func_def[0] == "lambda"): # calling lamdba function 
-            func_def.insert(0, "func")
-        self.check_func_def(func_def, func_call)
-        if (len(func_def) == 3): # no parameters, only return type
-            self.return_type_stack_.append(func_def[2])
-            this_func = func_def[1]
-            self.scope_stack_.append([this_func, []]) # create new stack entry for this func
-            self.scope_stack_[-1][1].append({}) # create var dict for this func
-            ind = self.index_of_func(self.current_func_)
-            if (func_def[1] == "lambda"):
-                scope = self.get_scope(func_call[1])
-                captured_var = copy.deepcopy(self.scope_stack_[ind][1][scope][func_call[1]][0][1])
-                self.scope_stack_[-1][1] = captured_var
-            if ("." in func_call[1]): # method call, add "this"
-                ind = self.index_of_func(func_def[1])
-                obj = func_call[1].split(".")[0]
-                self.scope_stack_[ind][1][0]["this"] = self.scope_stack_[-2][1][0][obj]
-            return 
-        self.return_type_stack_.append(func_def[len(func_def)-1]) # extract return type 
-
-        arg_def = []
-        for arg in func_call[2:]: # extract arg from caller & check if valid 
-            if (self.is_in_scope(arg)):
-                scope = self.get_scope(arg)
-                ind = self.index_of_func(self.current_func_)
-                if ("." in arg): # obj mem 
-                    obj = arg.split(".")[0]
-                    mem = arg.split(".")[1]
-                    arg_def.append(self.scope_stack_[ind][1][scope][obj][0][mem])
+    def compile_typed_expression(self, ind, exp): # prefix expression to postfix code, operands still evaluated right to left 
+        code = []
+        types = [] # static type of each value on the stack 
+        definite = True # nothing evaluated so far can fail 
+        for token in reversed(exp):
+            if (token in self.operators):
+                if (len(types) < 2): # operator is missing an operand 
+                    return ((self.ERROR_OP, ErrorType.SYNTAX_ERROR.name),), None, False
+                t1 = types.pop() # left operand 
+                t2 = types.pop()
+                if (t1 != None and t1 == t2 and t1 in self.op_def_[token]): # operand types known, bind the typed function 
+                    code.append((self.APPLY_OP, token, t1))
+                    types.append(self.op_def_[token][t1][1])
                 else:
-                    arg_def.append(self.scope_stack_[ind][1][scope][arg])
-            else: # a constant is passed in 
-                arg_def.append([arg, self.check_type(arg)])
-        this_func = func_def[1]
-        if (func_def[1] == "lambda"):
-            scope = self.get_scope(func_call[1])
-            ind = self.index_of_func(self.current_func_)
-            captured_var = copy.deepcopy(self.scope_stack_[ind][1][scope][func_call[1]][0][1])
-            self.scope_stack_.append([this_func, []]) # create new stack entry for this func
-            self.scope_stack_[-1][1].append({}) # create var dict for this func
-            self.scope_stack_[-1][1] = captured_var
-        else:
-            self.scope_stack_.append([this_func, []]) # create new stack entry for this func
-            self.scope_stack_[-1][1].append({}) # create var dict for this func
-        ind = self.index_of_func(this_func)
-        for index, parameter in enumerate(func_def[2:-1]): # traverse through parameters
-            param_def = parameter.split(":")
-            self.check_param_type(param_def[1], arg_def[index][1]) # check if the parameter types are valid/if they match
-        
-            if (param_def[1] in self.param_def_): # pass by value  
-                self.scope_stack_[ind][1][0][param_def[0]] = [arg_def[index][0], arg_def[index][1]]
-
-            elif (param_def[1] == self.OBJECT_DEF):
-                this_var = copy.deepcopy(func_call[index+2])
-                scope = self.get_scope(this_var)
-                curr_ind = self.index_of_func(self.current_func_)
-                if ("." in this_var):
-                    member = this_var.split(".")[1]
-                    this_var = this_var.split(".")[0]
-                self.scope_stack_[ind][1][0][param_def[0]] = [{}, self.OBJECT_DEF]
-                if ("." not in func_call[index+2]):
-                    self.scope_stack_[ind][1][0][param_def[0]][0] = self.scope_stack_[curr_ind][1][scope][this_var][0]
-                else: 
-                    self.scope_stack_[ind][1][0][param_def[0]][0] = self.scope_stack_[curr_ind][1][scope][this_var][0][member][0]
-
-            elif (param_def[1] in self.param_ref_def_): # pass by reference & object
-                self.scope_stack_[ind][1][0][param_def[0]] = arg_def[index] 
-
-        if ("." in func_call[1]): # method call, add "this"
-            obj = func_call[1].split(".")[0]
-            self.scope_stack_[ind][1][0]["this"] = self.scope_stack_[-2][1][0][obj]
-
-    def funccall_user_def(self, p):
-        func_name = p[1]
-        if (func_name not in self.func_dict_):
-            self.check_type(func_name)
-            super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
-        else:
-            func_index = self.func_dict_[func_name]
-            func_def_ = self.program_statements_[func_index]
-            self.funccall_stack_.append([self.ip_+1, self.current_func_])
-            self.parse_func_def(func_def_, p)
-            self.ip_ = self.jump_from_return(func_index)
-            if (self.program_statements_[self.ip_+1][0] == "func" and self.program_statements_[self.ip_+1][1] == "lambda"): # redefining env for lambda func 
-                self.program_statements_[self.ip_+1].pop(0)
-            self.current_func_ = func_name # change func name for the dict 
-
-    def funccall_var(self, p):
-        func_var = p[1]
-        scope = self.get_scope(p[1])
-        if ("." in p[1]): 
-            if (self.check_type(p[1]) == self.FUNC_DEF):
-                obj = p[1].split(".")[0]
-                mem = p[1].split(".")[1]
-                func_index = self.scope_stack_[-1][1][scope][obj][0][mem][0]
-                while (isinstance(func_index, list)):
-                    func_index = func_index[0]
+                    if (definite and t1 != None and t2 != None): # always fails once the line runs 
+                        raise CheckFailed(ErrorType.TYPE_ERROR)
+                    code.append((self.APPLY_OP, token, None))
+                    types.append(None)
             else:
-                super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
-        else: 
-            func_index = self.scope_stack_[-1][1][scope][p[1]][0]
-            while (isinstance(func_index, list)):
-                func_index = func_index[0]
-
-        if (isinstance(func_index, str)): # we have not assigned line num to this func var yet 
-            if (func_index == "default"):
-                return
-            self.scope_stack_[-1][1][scope][p[1]][0] = self.func_dict_[func_index]
-            func_index = self.scope_stack_[-1][1][scope][p[1]][0]
-        func_def_ = self.program_statements_[func_index]
-        self.funccall_stack_.append([self.ip_+1, self.current_func_])
-        self.parse_func_def(func_def_, p)
-        self.ip_ = self.jump_from_return(func_index)
-        self.current_func_ = func_def_[1] # change func name for the dict 
-    
-    def get_member(self, p):
-        self.check_type(p)
-        obj = p.split(".")[0]
-        member = p.split(".")[1]
-        scope = self.get_scope(obj)
-        obj_dict_ = self.scope_stack_[-1][1][scope][obj][0]
-        if (member not in obj_dict_):
-            super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
-        return obj_dict_[member][0]
+                operand = self.compile_operand(ind, token)
+                code.append(operand)
+                types.append(self.static_type(operand))
+                definite = definite and self.is_definite(operand)
+        return tuple(code), types[-1], definite
+
+    def compile_func(self, ind, p):
+        self.open_frame(ind)
+        param_slots = tuple([self.declare_param(param) for param in p[2:-1]])
+        return (self.FUNC_OP, p[1], tuple(p[2:-1]), p[-1], param_slots)
+
+    def compile_var(self, ind, p):
+        if (len(p) <= 2):
+            return (self.ERROR_OP, ErrorType.NAME_ERROR.name)
+        for var in p[2:]: # check for valid variable names 
+            if (not var[0].isalpha() or "." in var):
+                return (self.ERROR_OP, ErrorType.NAME_ERROR.name)
+        if (p[1] not in self.default_def_):
+            return (self.ERROR_OP, ErrorType.TYPE_ERROR.name)
+        if (len(self.layouts_[-1]) == 1): # redefining a captured var has to find it set 
+            for var in p[2:]:
+                self.resolve(var)
+        return (self.VAR_OP, p[1], tuple([self.declare(var, p[1]) for var in p[2:]]))
 
-    def funccall_def(self, p):
-        output = ""
+    def compile_assign(self, ind, p):
+        if (len(p) <= 2):
+            return (self.ERROR_OP, ErrorType.NAME_ERROR.name)
+        target = self.compile_operand(ind, p[1])
+        if (target[0] == self.PUSH_VAR_OP and target[2] == None): # a function, not a var 
+            raise CheckFailed(ErrorType.NAME_ERROR)
+        self.write(target)
+        target_type = self.static_type(target) if (self.is_definite(target)) else None
+        if (p[2] in self.operators): # expression 
+            code, type_, definite = self.compile_typed_expression(ind, p[2:])
+            if (definite and target_type != None and type_ != None and type_ != target_type): # types of expression and var never match 
+                raise CheckFailed(ErrorType.TYPE_ERROR)
+            if (target_type != None and type_ == target_type):
+                return (self.ASSIGN_TYPED_OP, target, code)
+            return (self.ASSIGN_EXP_OP, target, code)
+        source = self.compile_operand(ind, p[2])
+        source_type = self.static_type(source) if (self.is_definite(source)) else None
+        if (target_type != None and source_type != None and source_type != target_type):
+            if (source[0] != self.PUSH_VAR_OP or source[2] != None or target_type == self.OBJECT_DEF): # a function name is only checked against objects 
+                raise CheckFailed(ErrorType.TYPE_ERROR)
+        return (self.ASSIGN_OP, target, source)
+
+    def compile_funccall(self, ind, p):
+        if (len(p) < 2):
+            return (self.ERROR_OP, ErrorType.NAME_ERROR.name)
+        args = tuple([self.compile_operand(ind, arg) for arg in p[2:]])
         if (p[1] == self.PRINT_DEF):
-            for token in p[2:]:
-                if ("." in token and token[0] != '"'): # obj member
-                    member = self.get_member(token)
-                    if (self.check_type(member) == self.STRING_DEF):
-                        output += member.strip('\"')
-                    else:
-                        output += str(member)
-                elif (self.is_in_scope(token)): # token is in scope 
-                    scope = self.get_scope(token)
-                    var_scope = self.scope_stack_[-1][1][scope]
-                    if (var_scope[token][1] == self.STRING_DEF):
-                        output += var_scope[token][0].strip('\"')
-                    else: 
-                        output += str(var_scope[token][0])
-                elif (self.check_type(token) != self.INT_DEF and self.check_type(token) != self.STRING_DEF and self.check_type(token) != self.BOOL_DEF):
-                    super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
-                else:
-                    output += token.strip('\"')
-
-            super().output(output) 
-
+            return (self.PRINT_OP, args)
         elif (p[1] == self.STRTOINT_DEF):
-            if (self.is_in_scope(p[2])):
-                scope = self.get_scope(p[2])
-                var_scope = self.scope_stack_[-1][1][scope]
-                if (var_scope[p[2]][1] == self.STRING_DEF):
-                    self.resulti_ = int(var_scope[p[2]][0].strip('\"'))
-                    self.scope_stack_[-1][1][0]["resulti"] = [self.resulti_, self.INT_DEF] # add to current func
-                    if (self.funccall_stack_): # add to caller func
-                        func_name = self.funccall_stack_[-1][1]
-                        ind = self.index_of_func(func_name)
-                        self.scope_stack_[ind][1][0]["resulti"] = [self.resulti_, self.INT_DEF]     
-                else:
-                    super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
-            else:
-                if (p[2][0] == '"'):
-                    self.resulti_ = int(p[2].strip('\"'))
-                    self.scope_stack_[-1][1][0]["resulti"] = [self.resulti_, self.INT_DEF] # add to current func
-                    if (self.funccall_stack_): # add to caller func
-                        func_name = self.funccall_stack_[-1][1]
-                        ind = self.index_of_func(func_name)
-                        self.scope_stack_[ind][1][0]["resulti"] = [self.resulti_, self.INT_DEF] 
-                else:
-                    super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
-
+            if (len(args) == 0):
+                return (self.ERROR_OP, ErrorType.NAME_ERROR.name)
+            return (self.STRTOINT_OP, args[0])
         elif (p[1] == self.INPUT_DEF):
-            for token in p[2:]:
-                if (self.is_in_scope(token)): # token is in scope 
-                    scope = self.get_scope(token)
-                    var_scope = self.scope_stack_[-1][1][scope]
-                    if (var_scope[token][1] == self.STRING_DEF):
-                        output += var_scope[token][0].strip('\"')
-                    else: 
-                        output += str(var_scope[token][0])
-                elif (self.check_type(token) != self.INT_DEF and self.check_type(token) != self.STRING_DEF and self.check_type(token) != self.BOOL_DEF):
-                    super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
+            return (self.INPUT_OP, args)
+        elif (p[1] == self.INPUT_ALL_DEF):
+            return (self.INPUT_ALL_OP, args)
+        callee = self.compile_operand(ind, p[1])
+        for arg in args: # a ref param may change it 
+            self.write(arg)
+        if (callee[0] == self.PUSH_VAR_OP and callee[2] == None): # always this function, check the call now 
+            ins = self.check_call(ind, callee[4], args)
+            if (ins[0] == self.CALL_DIRECT_OP and self.is_tail_call(ind, callee[4])):
+                return (self.TAIL_CALL_OP,) + ins[1:]
+            return ins
+        return (self.CALL_OP, callee, args)
+
+    def is_tail_call(self, ind, func_index): # the caller returns the callee's result as is, so nothing of its frame is needed after the call 
+        func_def = self.program_statements_[self.layouts_[-1][0][2]]
+        if (func_def[0] == self.FUNC_DEF and func_def[1] == "main"): # main has no caller to return to 
+            return False
+        ret_type = func_def[-1]
+        callee_type = self.program_statements_[func_index][-1]
+        next_ind = ind + 1
+        while (self.program_statements_[next_ind] == []):
+            next_ind += 1
+        p = self.program_statements_[next_ind]
+        if (p == [self.RETURN_DEF] or p[0] == self.ENDFUNC_DEF or p[0] == self.ENDLAMBDA_DEF): # nothing is returned 
+            if (ret_type != self.VOID_DEF or callee_type != self.VOID_DEF):
+                return False
+        elif (p[0] != self.RETURN_DEF or len(p) != 2 or p[1] != self.result_def_.get(callee_type) or ret_type != callee_type): # not returning the callee's result var 
+            return False
+        for line in range(func_index + 1, self.block_table_[func_index]): # builtins in the callee also set the result vars of its caller 
+            body = self.program_statements_[line]
+            if (len(body) > 1 and body[0] == self.FUNCCALL_DEF and body[1] in (self.STRTOINT_DEF, self.INPUT_DEF, self.INPUT_ALL_DEF)):
+                return False
+        return True
+
+    def check_call(self, ind, func_index, args): # the checks the signature would do on every call 
+        func_def = self.program_statements_[func_index]
+        params = func_def[2:-1]
+        if (func_def[-1] not in self.return_def_ or len(params) != len(args)): # invalid return type, or num of params do not match 
+            raise CheckFailed(ErrorType.NAME_ERROR)
+        names = [param.split(":")[0] for param in params]
+        for param in params:
+            if (len(param.split(":")) != 2 or names.count(param.split(":")[0]) > 1):
+                raise CheckFailed(ErrorType.NAME_ERROR)
+        for arg in args:
+            if (not self.is_definite(arg)): # loading it may fail before the params are checked 
+                return (self.CALL_OP, (self.PUSH_VAR_OP, func_def[1], None, None, func_index), args)
+        refs = []
+        for index, param in enumerate(params):
+            param_type = param.split(":")[1]
+            arg_type = self.static_type(args[index])
+            if (param_type not in self.param_def_ and param_type not in self.param_ref_def_): # invalid parameter type 
+                raise CheckFailed(ErrorType.NAME_ERROR)
+            if (param_type != arg_type and param_type[3:] != arg_type):
+                raise CheckFailed(ErrorType.TYPE_ERROR)
+            refs.append(param_type != arg_type)
+        return (self.CALL_DIRECT_OP, func_index, args, tuple(refs))
+
+    def compile_return(self, ind, p):
+        if (len(p) == 1): # 'return' statement
+            return (self.RETURN_OP, None)
+        code, type_, definite = self.compile_typed_expression(ind, p[1:])
+        func_def = self.program_statements_[self.layouts_[-1][0][2]]
+        if (func_def[0] == self.FUNC_DEF and func_def[1] == "main"): # main might be the bottom frame, where any value is an error 
+            return (self.RETURN_OP, code)
+        if (":" in func_def[-1]): # lambda with a broken header, never called 
+            return (self.RETURN_OP, code)
+        if (definite and type_ != None and type_ != func_def[-1] and func_def[-1] in self.return_def_): # never the declared return type 
+            raise CheckFailed(ErrorType.TYPE_ERROR)
+        if (type_ != None and type_ == func_def[-1]):
+            return (self.RETURN_TYPED_OP, code)
+        return (self.RETURN_OP, code)
+
+    def compile_endfunc(self, ind, p):
+        self.close_frame()
+        return (self.ENDFUNC_OP,)
+
+    def compile_condition(self, ind, exp):
+        code, type_, definite = self.compile_typed_expression(ind, exp)
+        if (definite and type_ != None and type_ != self.BOOL_DEF): # int or string condition 
+            raise CheckFailed(ErrorType.TYPE_ERROR)
+        return code
+
+    def compile_while(self, ind, p):
+        condition = self.compile_condition(ind, p[1:])
+        self.open_block(ind)
+        return (self.WHILE_OP, condition, self.block_table_[ind] + 1)
+
+    def compile_endwhile(self, ind, p):
+        self.close_block()
+        return (self.ENDWHILE_OP, self.block_table_[ind]) # back to the corresponding while statement
+
+    def compile_if(self, ind, p):
+        condition = self.compile_condition(ind, p[1:])
+        self.open_block(ind)
+        else_ip = self.block_table_[ind]
+        if (self.program_statements_[else_ip][0] != self.ELSE_DEF):
+            else_ip -= 1 # land on endif so it closes the scope
+        return (self.IF_OP, condition, else_ip + 1)
+
+    def compile_else(self, ind, p):
+        self.layouts_[-1][-1][0] = {} # else shares the if's block, but none of its vars 
+        self.layouts_[-1][-1][3] = {}
+        return (self.JUMP_OP, self.block_table_[ind]) # end of the if branch, skip to endif 
+
+    def compile_endif(self, ind, p):
+        self.close_block()
+        return (self.POP_SCOPE_OP,)
+
+    def compile_lambda(self, ind, p):
+        captured = self.visible_names()
+        self.open_frame(ind)
+        captures = [(address[0], address[1], self.declare(name, address[2]), address[2]) for name, address in captured.items()]
+        param_slots = tuple([self.declare_param(param) for param in p[1:-1]])
+        self.captures_[ind] = [capture for capture in captures if capture[2] not in param_slots] # params replace them anyway 
+        if (":" in p[len(p)-1]):
+            return (self.ERROR_OP, ErrorType.NAME_ERROR.name)
+        return (self.LAMBDA_OP, tuple(p[1:-1]), p[-1], self.block_table_[ind] + 1, param_slots, ())
+
+    def dump_bytecode(self, bytecode): # bytecode is plain tuples, so it can be cached or sent to another process 
+        return marshal.dumps(bytecode)
+
+    def load_bytecode(self, data):
+        bytecode = marshal.loads(data)
+        if (bytecode[0] != self.BYTECODE_VERSION): # compiled by another version of the interpreter 
+            raise ValueError("bytecode version " + str(bytecode[0]) + " is not " + str(self.BYTECODE_VERSION))
+        return bytecode
+
+    def disassemble(self, bytecode): # one text line per instruction, for debugging 
+        lines = []
+        for ind, ins in enumerate(bytecode[1]):
+            if (ins[0] == self.NOP_OP):
+                continue
+            slot_args = self.slot_args_.get(ins[0], ())
+            args = []
+            for pos in range(1, len(ins)):
+                if (pos in slot_args):
+                    args.append(self.format_slots(ins[pos]))
+                elif (pos == len(ins) - 1 and ins[0] in (self.FUNC_OP, self.LAMBDA_OP, self.WHILE_OP, self.IF_OP)): # size of its block 
+                    args.append("slots=" + str(ins[pos]))
                 else:
-                    if (isinstance(token, str)):
-                        output += token.strip('\"')
-                    else:
-                        output += str(token)
-            super().output(output) 
-            res = super().get_input()
-            self.results_ = '"' + res + '"'
-            self.scope_stack_[-1][1][0]["results"] = [self.results_, self.STRING_DEF] # add to current func
-            if (self.funccall_stack_): # add to caller func
-                func_name = self.funccall_stack_[-1][1]
-                ind = self.index_of_func(func_name)
-                self.scope_stack_[ind][1][0]["results"] = [self.results_, self.STRING_DEF]    
-
-        elif (self.is_in_scope(p[1])): # calling a function variable 
-            scope = self.get_scope(p[1])
-            if (p[1] == "resultf"):
-                self.funccall_var(p)
-                return
-            elif ("." not in p[1]):
-                if (self.scope_stack_[-1][1][scope][p[1]][1] != self.FUNC_DEF):
-                    super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
-            self.funccall_var(p) 
-
-        else:  
-            self.funccall_user_def(p)
-
-    def evaluate_string_exp(self, v1, v2, i):
-        if (self.is_in_scope(v1)):
-            scope_v1 = self.get_scope(v1)
-            v1 =  self.scope_stack_[-1][1][scope_v1][v1][0]
-        if (self.is_in_scope(v2)):
-            scope_v2 = self.get_scope(v2)
-            v2 =  self.scope_stack_[-1][1][scope_v2][v2][0]
-        v1 = v1.strip('\"')
-        v2 = v2.strip('\"')
-        if (i == '+'):
-            return v1 + v2
-        elif (i == '<'):
-            return v1 < v2
-        elif (i == '>'):
-            return v1 > v2
-        elif (i == '<='):
-            return v1 <= v2
-        elif (i == '>='):
-            return v1 >= v2
-        elif (i == '!='):
-            return v1 != v2
-        elif (i == '=='):
-            return v1 == v2
-        else:
+                    args.append(self.format_arg(ins[pos], bytecode[3]))
+            lines.append(str(ind).rjust(5) + "  " + self.opcode_names_[ins[0]].ljust(14) + " ".join(args))
+        return lines
+
+    def format_slots(self, arg):
+        if (len(arg) > 0 and isinstance(arg[0], tuple)): # captures 
+            return "[" + " ".join([str(a[0]) + ":" + str(a[1]) + ">" + str(a[2]) + self.capture_names_[a[3]] for a in arg]) + "]"
+        return "(" + " ".join([str(a) for a in arg]) + ")"
+
+    def format_arg(self, arg, consts):
+        if (isinstance(arg, tuple) and len(arg) > 0 and isinstance(arg[0], tuple)): # args or expression code 
+            return "[" + " ".join([self.format_arg(a, consts) for a in arg]) + "]"
+        elif (isinstance(arg, tuple) and len(arg) > 0 and isinstance(arg[0], int)): # push or operator 
+            if (arg[0] == self.PUSH_CONST_OP and consts[arg[1]][0] == self.STRING_DEF):
+                return '"' + consts[arg[1]][1] + '"'
+            elif (arg[0] == self.PUSH_CONST_OP):
+                return str(consts[arg[1]][1])
+            elif (arg[0] == self.PUSH_MEMBER_OP):
+                return arg[1] + "@" + str(arg[2]) + ":" + str(arg[3]) + "." + arg[4]
+            elif (arg[0] == self.PUSH_VAR_OP and arg[2] != None):
+                return arg[1] + "@" + str(arg[2]) + ":" + str(arg[3])
+            elif (arg[0] == self.ERROR_OP):
+                return "<" + arg[1] + ">"
+            elif (arg[0] == self.APPLY_OP and arg[2] != None):
+                return arg[1] + ":" + arg[2]
+            return str(arg[1])
+        elif (isinstance(arg, tuple)): # names 
+            return "(" + " ".join(arg) + ")"
+        elif (isinstance(arg, int)):
+            return "-> " + str(arg)
+        elif (arg == None):
+            return "-"
+        return str(arg)
+
+    def get_member(self, operand): # cell of obj.mem, its index cached for the last shape seen at this site 
+        obj_cell = self.frame_.blocks_[operand[2]][operand[3]]
+        if (obj_cell == None):
+            super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
+        if (obj_cell.type_ != self.OBJECT_DEF): # dot op. on non-object var 
             super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
-
-    def evaluate_int_exp(self, v1, v2, i):
-        if (not isinstance(v1, int)):
-            if (self.is_in_scope(v1)):
-                scope_v1 = self.get_scope(v1)
-                v1 =  self.scope_stack_[-1][1][scope_v1][v1][0]
-        if (not isinstance(v2, int)):
-            if (self.is_in_scope(v2)):
-                scope_v2 = self.get_scope(v2)
-                v2 =  self.scope_stack_[-1][1][scope_v2][v2][0]
-        v1 = int(v1)
-        v2 = int(v2)
-        if (i == '+'):
-            return v1 + v2
-        elif (i == '-'):
-            return v1 - v2
-        elif (i == '*'):
-            return v1 * v2
-        elif (i == '/'):
-            return v1 // v2
-        elif (i == '%'):
-            return v1 % v2
-        elif (i == '<'):
-            return v1 < v2
-        elif (i == '>'):
-            return v1 > v2
-        elif (i == '<='):
-            return v1 <= v2
-        elif (i == '>='):
-            return v1 >= v2
-        elif (i == '!='):
-            return v1 != v2
-        elif (i == '=='):
-            return v1 == v2
+        obj = obj_cell.value_
+        cache = operand[5]
+        if (obj.shape_ is cache[0] and cache[2] == None):
+            return obj.cells_[cache[1]]
+        index = obj.shape_.slots_.get(operand[4])
+        if (index == None):
+            super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
+        cache[0], cache[1], cache[2] = obj.shape_, index, None
+        return obj.cells_[index]
+
+    def has_member(self, operand):
+        obj_cell = self.frame_.blocks_[operand[2]][operand[3]]
+        return obj_cell != None and obj_cell.type_ == self.OBJECT_DEF and operand[4] in obj_cell.value_.shape_.slots_
+
+    def set_member(self, operand, obj, cell): # set obj.mem to cell, adding the member if it is new 
+        cache = operand[5]
+        if (obj.shape_ is cache[0]): # same shape as last time, reuse its index or move to the same next shape 
+            if (cache[2] == None):
+                obj.cells_[cache[1]] = cell
+            else:
+                obj.shape_ = cache[2]
+                obj.cells_.append(cell)
+            return
+        shape = obj.shape_
+        index = shape.slots_.get(operand[4])
+        if (index != None):
+            obj.cells_[index] = cell
+            cache[0], cache[1], cache[2] = shape, index, None
         else:
-            super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
-
-    def evaluate_bool_exp(self, v1, v2, i): 
-        if (not isinstance(v1, bool)):
-            if (self.is_in_scope(v1)):
-                scope_v1 = self.get_scope(v1)
-                v1 =  self.scope_stack_[-1][1][scope_v1][v1][0]
-        if (not isinstance(v2, bool)):
-            if (self.is_in_scope(v2)):
-                scope_v2 = self.get_scope(v2)
-                v2 =  self.scope_stack_[-1][1][scope_v2][v2][0]
-        if (v1 != True and v1 != False):
-            v1 = eval(v1)
-        if (v2 != True and v2 != False):
-            v2 = eval(v2)
-        if (i == '!='):
-            return v1 != v2
-        elif (i == '=='):
-            return v1 == v2
-        elif (i == '&'):
-            return v1 & v2
-        elif (i == '|'):
-            return v1 | v2 
+            obj.shape_ = shape.add(operand[4])
+            obj.cells_.append(cell)
+            cache[0], cache[1], cache[2] = shape, len(obj.cells_) - 1, obj.shape_
+
+    def load(self, operand): # Value of a push instruction, not to be changed 
+        if (operand[0] == self.PUSH_CONST_OP):
+            return self.consts_[operand[1]]
+        elif (operand[0] == self.PUSH_MEMBER_OP):
+            return self.get_member(operand)
+        if (operand[2] != None):
+            cell = self.frame_.blocks_[operand[2]][operand[3]]
+            if (cell != None):
+                return cell
+        if (operand[4] != None): # name of a function 
+            return Value(operand[4], self.FUNC_DEF)
+        super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
+
+    def find(self, operand): # like load, but variables and members that are not set yield None 
+        if (operand[0] == self.PUSH_MEMBER_OP):
+            if (self.has_member(operand)):
+                return self.get_member(operand)
+            return None
+        elif (operand[0] == self.PUSH_VAR_OP and operand[2] != None):
+            return self.frame_.blocks_[operand[2]][operand[3]]
+        return None
+
+    def argument(self, operand): # cell passed for an argument 
+        cell = self.find(operand)
+        if (cell != None): # var or member, passed as is so refs can share it 
+            return cell
+        value = self.load(operand)
+        return Value(value.value_, value.type_) # constants get a cell of their own
+
+    def text(self, operand): # printed text of an operand 
+        if (operand[0] == self.PUSH_VAR_OP):
+            cell = self.find(operand)
+            if (cell == None): # unset var, or a function 
+                super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
         else:
+            cell = self.load(operand)
+        return self.format_value(cell.value_, cell.type_)
+
+    def link(self, ins): # operands of an instruction, with expression code prebuilt into an evaluator 
+        args = tuple([self.link_member(arg) for arg in ins[1:]])
+        pos = self.expression_args_.get(ins[0])
+        if (pos != None and args[pos-1] != None):
+            args = args[:pos-1] + (self.link_expression(args[pos-1]),) + args[pos:]
+        return args
+
+    def link_member(self, arg): # member operands get an inline cache of [shape, index, next shape] for their site 
+        if (not isinstance(arg, tuple) or len(arg) == 0):
+            return arg
+        elif (arg[0] == self.PUSH_MEMBER_OP and len(arg) == 5 and isinstance(arg[1], str)):
+            return arg + ([None, 0, None],)
+        elif (isinstance(arg[0], tuple)): # args or expression code 
+            return tuple([self.link_member(a) for a in arg])
+        return arg
+
+    def link_expression(self, code): # closure returning the Value of postfix code 
+        nodes = []
+        for ins in code:
+            if (ins[0] == self.APPLY_OP):
+                left = nodes.pop()
+                right = nodes.pop()
+                nodes.append(self.link_operator(ins[1], ins[2], left, right))
+            elif (ins[0] == self.ERROR_OP):
+                nodes.append(self.link_error(ins[1]))
+            else:
+                nodes.append(self.link_operand(ins))
+        if (len(nodes) == 1):
+            return nodes[0]
+        def evaluate_all(): # operands left without an operator still get loaded, last one is the result 
+            for node in nodes:
+                result = node()
+            return result
+        return evaluate_all
+
+    def link_error(self, error_name):
+        def raise_error():
+            super(Interpreter, self).error(ErrorType[error_name], line_num = self.ip_)
+        return raise_error
+
+    def link_operand(self, operand):
+        if (operand[0] == self.PUSH_CONST_OP or (operand[0] == self.PUSH_VAR_OP and operand[2] == None)): # constant or function 
+            value = self.load(operand)
+            return lambda: value
+        elif (operand[0] == self.PUSH_MEMBER_OP):
+            block, slot, cache = operand[2], operand[3], operand[5]
+            def load_member():
+                obj_cell = self.frame_.blocks_[block][slot]
+                if (obj_cell != None and obj_cell.type_ == self.OBJECT_DEF and obj_cell.value_.shape_ is cache[0] and cache[2] == None):
+                    return obj_cell.value_.cells_[cache[1]]
+                return self.get_member(operand) # another shape, or an error 
+            return load_member
+        block = operand[2]
+        slot = operand[3]
+        def load_var():
+            cell = self.frame_.blocks_[block][slot]
+            if (cell != None):
+                return cell
+            return self.load(operand) # unset, a function or an error 
+        return load_var
+
+    def link_operator(self, op, type_, left, right):
+        if (type_ != None): # operand types are known, no checks needed 
+            func, result_type = self.op_def_[op][type_]
+            def apply_typed():
+                v2 = right() # the right operand is evaluated first 
+                v1 = left()
+                return Value(func(v1.value_, v2.value_), result_type)
+            return apply_typed
+        ops = self.op_def_[op]
+        def apply():
+            v2 = right()
+            v1 = left()
+            if (v1.type_ != v2.type_): # types do not match
+                super(Interpreter, self).error(ErrorType.TYPE_ERROR, line_num = self.ip_)
+            if (v1.type_ not in ops): # operator not defined for this type, funcs and objects have none 
+                super(Interpreter, self).error(ErrorType.TYPE_ERROR, line_num = self.ip_)
+            func, result_type = ops[v1.type_]
+            return Value(func(v1.value_, v2.value_), result_type)
+        return apply
+
+    def evaluate_condition(self, code): # bool value of a while/if condition 
+        result = code()
+        if (result.type_ != self.BOOL_DEF): # int or string passed in 
             super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
+        return result.value_
 
-    def evaluate_expression(self, exp): # takes in expression list 
-        stack = []
-        for i in reversed(exp):
-            if ("." in i): # obj member 
-                stack.append(self.get_member(i))
-            elif (i not in self.operators): # int, string, or var 
-                stack.append(i)
-            else:
-                v1 = stack.pop()
-                v2 = stack.pop()
-                if (self.check_type(v1) != self.check_type(v2)): # types do not match
-                    super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
-                    return
-                if (self.check_type(v1) == self.STRING_DEF):
-                    result = self.evaluate_string_exp(v1, v2, i)
-                    if (i == '+'):
-                        result = '"' + result + '"'
-                    stack.append(result)
-                elif (self.check_type(v1) == self.INT_DEF):
-                    stack.append(self.evaluate_int_exp(v1, v2, i))
-                elif (self.check_type(v1) == self.BOOL_DEF):
-                    stack.append(self.evaluate_bool_exp(v1, v2, i))
-                elif (isinstance(v1, str)):
-                    stack.append(self.evaluate_string_exp(v1, v2, i))
-        return stack.pop()
-
-    def handle_operation(self, p):
-        expression = []
-        if (p[0] == self.ASSIGN_DEF): # assign statement
-            expression = p[2:]
-            result = self.evaluate_expression(expression)
-            if (self.is_in_scope(p[1])):
-                scope = self.get_scope(p[1]) # get the scope of var we are assigning expression to 
-            elif ("." in p[1] and self.check_type(p[1].split(".")[0]) != self.OBJECT_DEF):
-                super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
-            else:
-                super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
+    def format_value(self, value, type_):
+        if (type_ == self.STRING_DEF):
+            return value
+        return str(value)
 
-            if ("." in p[1]): # assign result of exp to object mem 
-                obj = p[1].split(".")[0]
-                mem = p[1].split(".")[1]
-                var = self.scope_stack_[-1][1][scope][obj][0][mem][0]
-                if (self.check_type(var) != self.check_type(result)):
-                    super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
-                else:
-                    self.scope_stack_[-1][1][scope][obj][0][mem][0] = result
-            else: 
-                if (self.scope_stack_[-1][1][scope][p[1]][1] != self.check_type(result)): # types of expression and var do not match
-                    super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
-                else: 
-                    self.scope_stack_[-1][1][scope][p[1]][0] = result
-        elif (p[0] == self.RETURN_DEF): # return statement 
-            expression = p[1:]
-            return self.evaluate_expression(expression)
-
-    def handle_member_set(self, p, obj_scope):
-        split = p[1].split(".")
-        if (self.check_type(split[0]) != self.OBJECT_DEF): # dot op. on non-object var 
-            super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
-        obj_scope[split[0]][0][split[1]] = [p[2], self.check_type(p[2])]
+    def nop(self, *args): # empty lines and func headers 
+        return
 
-    def assign_def(self, p):
-        if (len(p) <= 2):
-            super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
+    def error_def(self, error_name):
+        super().error(ErrorType[error_name], line_num = self.ip_)
 
-        if ("." in p[1]):
-            p1 = p[1].split(".")[0]
-        else:
-            p1 = p[1]
-            
-        if (self.is_in_scope(p1)): # var exists in outer scope 
-            scope = self.get_scope(p1) # get the scope level of the var 
-            scope_stack_1 = self.scope_stack_[-1][1][scope] # scope of p[1]
+    def var_def(self, type_, slots):
+        block = self.frame_.blocks_[-1] # current env of this func 
+        for slot in slots:
+            if (block[slot] != None): # var exists in the same scope (redefinition)
+                super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
+            if (type_ == self.OBJECT_DEF):
+                block[slot] = Value(Object(self.root_shape_), type_)
+            else:
+                block[slot] = Value(self.default_def_[type_], type_)
 
+    def assign_def(self, target, source):
+        if (target[0] == self.PUSH_MEMBER_OP):
+            target_cell = self.frame_.blocks_[target[2]][target[3]]
+            member = target[4]
         else:
+            target_cell = self.find(target)
+            member = None
+        if (target_cell == None):
             super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
-
-        if (p[2] in self.operators): # expression 
-            self.handle_operation(p)
-
-        elif (self.check_type(p1) == self.OBJECT_DEF and "." not in p[1] and self.check_type(p[2]) != self.OBJECT_DEF): # obj to non-obj assignment 
+        target_type = target_cell.type_
+        if (member != None and target_type != self.OBJECT_DEF): # dot op. on non-object var 
+            super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
+        if (target_type == self.OBJECT_DEF and member == None and self.load(source).type_ != self.OBJECT_DEF): # obj to non-obj assignment 
             super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
 
-        elif (self.is_in_scope(p[2])): # defined var assigned to another defined var 
-            scope = self.get_scope(p[2]) # get the scope level of the var 
-            scope_stack_2 = self.scope_stack_[-1][1][scope] # scope of p[2]
-
-            if (self.check_type(p1) == self.OBJECT_DEF and self.check_type(p[2]) != self.OBJECT_DEF): # obj to non-obj assignment
-                if ("." not in p[1]): # obj to mem
-                    obj_name = p[2].split(".")[0]
-                    member_name = p[2].split(".")[1]
-                    scope_stack_1[p[1]][0] = scope_stack_2[obj_name][0][member_name]
-                else: 
-                    member_obj = p[1].split(".")[0]
-                    member_name = p[1].split(".")[1]
-                    if ("." in p[2]): # mem to mem
-                        obj_name_2 = p[2].split(".")[0]
-                        member_name_2 = p[2].split(".")[1]
-                        scope_stack_1[member_obj][0][member_name] = [scope_stack_2[obj_name_2][0][member_name_2][0], scope_stack_2[obj_name_2][0][member_name_2][1]]
-                    else: # mem to var 
-                        if (member_name not in scope_stack_1[member_obj][0]):
-                            scope_stack_1[member_obj][0][member_name] = [scope_stack_2[p[2]][0], scope_stack_2[p[2]][1]]
-                        else:
-                            if (scope_stack_2[p[2]][1] == self.FUNC_DEF):
-                                scope_stack_1[member_obj][0][member_name] = scope_stack_2[p[2]][0]
-                            else:
-                                scope_stack_1[member_obj][0][member_name] = [scope_stack_2[p[2]][0], scope_stack_2[p[2]][1]]
-
-            elif (self.check_type(p1) == self.OBJECT_DEF and self.check_type(p[2]) == self.OBJECT_DEF): # obj to obj assignment 
-                if ("." not in p[1]): 
-                    if ("." not in p[2]): # obj to obj
-                        scope_stack_1[p[1]][0] = scope_stack_2[p[2]][0]
-                    else: # obj to mem
-                        obj_name = p[2].split(".")[0]
-                        member_name = p[2].split(".")[1]
-                        scope_stack_1[p[1]][0] = scope_stack_2[obj_name][0][member_name][0]
-                else:
-                    if ("." not in p[2]): # mem to obj 
-                        obj_name = p[1].split(".")[0]
-                        member_name = p[1].split(".")[1]
-                        scope_stack_1[obj_name][0][member_name] = [scope_stack_2[p[2]][0], scope_stack_2[p[2]][1]]
-                    else: # mem to mem
-                        obj_name = p[1].split(".")[0]
-                        member_name = p[1].split(".")[1]
-                        obj_name_2 = p[2].split(".")[0]
-                        member_name_2 = p[2].split(".")[1]
-                        scope_stack_1[member_obj][0][member_name] = [scope_stack_2[obj_name_2][0][member_name_2][0], scope_stack_2[obj_name_2][0][member_name_2][1]]
-
-            elif (self.check_type(p1) != self.check_type(p[2])):  
+        source_cell = self.find(source)
+        func_index = source[4] if (source[0] == self.PUSH_VAR_OP) else None
+        if (source_cell != None): # defined var assigned to another defined var 
+            if (member != None): # var or mem to mem, the member takes the source's type 
+                self.set_member(target, target_cell.value_, Value(source_cell.value_, source_cell.type_))
+            elif (target_type != source_cell.type_):
                 super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
-
+            elif (source[0] == self.PUSH_MEMBER_OP and target_type != self.OBJECT_DEF): # var now shares the member's cell 
+                self.frame_.blocks_[target[2]][target[3]] = source_cell
             else:
-                if ("." in p[2]):
-                    obj_name = p[2].split(".")[0]
-                    member_name = p[2].split(".")[1]
-                    scope_stack_1[p1] = scope_stack_2[obj_name][0][member_name]
-                else:
-                    scope_stack_1[p1][0] = scope_stack_2[p[2]][0]
-
-        elif (p[2] in self.func_dict_): # assign func to a function
-            if (self.check_type(p1) == self.OBJECT_DEF): # assigning obj mem to func 
-                obj = p[1].split(".")[0]
-                mem = p[1].split(".")[1]
-                scope_stack_1[obj][0][mem] = [self.func_dict_[p[2]], self.FUNC_DEF]
+                target_cell.value_ = source_cell.value_
+        elif (func_index != None): # assign func to a function 
+            if (member != None):
+                self.set_member(target, target_cell.value_, Value(func_index, self.FUNC_DEF))
             else:
-                scope_stack_1[p[1]][0] = [self.func_dict_[p[2]], self.FUNC_DEF] # set it to the line number
-
-        elif ("." in p[1]): # object member assignment to constant
-            self.handle_member_set(p, scope_stack_1)
-
+                target_cell.value_ = func_index # set it to the line number
+        elif (member != None): # object member assignment to constant
+            value = self.load(source)
+            self.set_member(target, target_cell.value_, Value(value.value_, value.type_))
         else: # defined var assigned to constant 
-            type_ = self.check_type(p[2])
-            if (type_ != self.INT_DEF and type_ != self.STRING_DEF and type_ != self.BOOL_DEF and type_ != self.FUNC_DEF):
-                super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
-            elif (scope_stack_1[p1][1] == type_): # assign if the types match
-                scope_stack_1[p1][0] = p[2]
-            else:
+            value = self.load(source)
+            if (value.type_ != target_type):
                 super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
+            target_cell.value_ = value.value_
 
-    def locate_endwhile(self):
-        while_count = 0
-        endwhile_count = 0
-        for index, p in enumerate(self.program_statements_[self.ip_+1:]): # go through program and find corresponding while/endwhile 
-            if (len(p) == 0):
-                continue 
-            elif (p[0] == "while"):
-                while_count += 1
-            elif (p[0] == "endwhile"):
-                if (while_count == endwhile_count):
-                    return self.ip_ + index
-                endwhile_count += 1
-
-    def handle_while_loop(self):
-        self.while_stack_.append(self.ip_)
-
-    def while_def(self, p):
-        expression = p[1:]
-        if (len(expression) == 1): # constant is passed in 
-            if (self.check_type(p[1]) != self.BOOL_DEF): # int or string passed in 
-                super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
-                return 
-
-            if (self.is_in_scope(p[1])): # var 
-                scope = self.get_scope(p[1])
-                scope_dict = self.scope_stack_[-1][1][scope]
-                if ("." in p[1]): # obj mem 
-                    obj = p[1].split(".")[0]
-                    mem = p[1].split(".")[1]
-                    result = scope_dict[obj][0][mem][0]
-                else: # regular var 
-                    if (scope_dict[p[1]][0] != True and scope_dict[p[1]][0] != False):
-                        result = eval(scope_dict[p[1]][0])
-                    else:
-                        result = scope_dict[p[1]][0]
-
-            else: # constant 
-                if (p[1] != True and p[1] != False):
-                    result = eval(p[1])
-                else:
-                    result = p[1]
-        else:
-            result = self.evaluate_expression(expression)
-        if (self.check_type(result) != self.BOOL_DEF):
-            super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
-            return 
-        if (result == True or result == "True"): # go into the while loop
-            self.scope_stack_[-1][1].append({}) # create new scope for while
-            self.handle_while_loop()
-            return 
-        if (result == False or result == "False"): # condition was not met 
-            self.ip_ = self.locate_endwhile() + 1
-            return 
-
-    def endwhile_def(self):
-        if (self.while_stack_):
-            while_ip = self.while_stack_.pop() # retrieve corresponding while statement
-            self.ip_ = self.jump_from_return(while_ip)
-            self.scope_stack_[-1][1].pop()
-            return
-
-    def locate_else_endif(self):
-        if_count = 0
-        endif_count = 0
-        for index, p in enumerate(self.program_statements_[self.ip_+1:]): # go through program and find corresponding else/endif
-            if (len(p) == 0):
-                continue
-            elif (p[0] == "if"):
-                if_count += 1
-            elif (p[0] == "else"):
-                if (if_count == endif_count):
-                    return self.ip_ + index + 1
-            elif (p[0] == "endif"):
-                if (if_count == endif_count): # we found the matching endif
-                    return self.ip_ + index 
-                endif_count += 1
-
-    def if_def(self, p):
-        expression = p[1:]
-        if (len(expression) == 1): # constant is passed in 
-            if (self.check_type(p[1]) != self.BOOL_DEF): # int or string passed in 
-                super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
-                return 
-
-            if (self.is_in_scope(p[1])): # var 
-                scope = self.get_scope(p[1])
-                scope_dict = self.scope_stack_[-1][1][scope]
-                if ("." in p[1]): # obj mem 
-                    obj = p[1].split(".")[0]
-                    mem = p[1].split(".")[1]
-                    result = scope_dict[obj][0][mem][0]
-                else: # regular var 
-                    if (scope_dict[p[1]][0] != True and scope_dict[p[1]][0] != False):
-                        result = eval(scope_dict[p[1]][0])
-                    else:
-                        result = scope_dict[p[1]][0]
-
-            else: # constant 
-                if (p[1] != True and p[1] != False):
-                    result = eval(p[1])
-                else:
-                    result = p[1]
+    def assign_typed_def(self, target, code): # the var is set and has the type of the expression 
+        self.frame_.blocks_[target[2]][target[3]].value_ = code().value_
 
-        else: # expression
-            result = self.evaluate_expression(expression)
-        if (self.check_type(result) != self.BOOL_DEF):
+    def assign_exp_def(self, target, code):
+        if (self.frame_.blocks_[target[2]][target[3]] == None):
+            super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
+        result = code()
+        target_cell = self.load(target) # the member, for an object mem target 
+        if (target_cell.type_ != result.type_): # types of expression and var do not match
             super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
-            return 
-        if (result == True or result == "True"): # go into the if statement 
-            self.scope_stack_[-1][1].append({}) # create new scope for if 
-            return
-        else: # if condition was not met 
-            self.ip_ = self.locate_else_endif()
-            self.scope_stack_[-1][1].append({}) # create new scope for else 
-            return
-
-    def else_def(self, p):
-        self.ip_ = self.locate_else_endif()
-        return
+        target_cell.value_ = result.value_
 
-    def endif_def(self, p):
-        self.scope_stack_[-1][1].pop()
-        return
+    def print_def(self, args):
+        self.output("".join([self.text(arg) for arg in args]))
 
-    def return_def(self, p):
-        if (not self.funccall_stack_): # we are trying to return in main
-            if (len(p) != 1): # not just a 'return'
+    def strtoint_def(self, arg):
+        cell = self.find(arg)
+        if (cell == None): # constant passed in 
+            if (arg[0] != self.PUSH_CONST_OP or self.consts_[arg[1]].type_ != self.STRING_DEF):
                 super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
-
-        if (not self.funccall_stack_): # stack is empty 
-            self.terminated_ = True
+            cell = self.consts_[arg[1]]
+        if (cell.type_ != self.STRING_DEF):
+            super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
+        self.set_builtin_result(self.INT_DEF, int(cell.value_))
+
+    def input_def(self, args):
+        self.output("".join([self.text(arg) for arg in args]))
+        self.flush_output() # the prompt shows before waiting for input 
+        self.set_builtin_result(self.STRING_DEF, self.get_input())
+
+    def input_all_def(self, args):
+        self.output("".join([self.text(arg) for arg in args]))
+        self.flush_output() # the prompt shows before waiting for input 
+        self.set_builtin_result(self.STRING_DEF, self.read_remaining_input())
+
+    def read_remaining_input(self): # every input line not read yet, joined by newlines 
+        if (self.input_source_ != None):
+            return self.input_source_.read_remaining()
+        elif (not self.input): # console input 
+            text = sys.stdin.read()
+            return text[:-1] if (text.endswith("\n")) else text
+        lines = []
+        line = super().get_input()
+        while (line != None): # the base gives None once the input list is used up 
+            lines.append(line)
+            line = super().get_input()
+        return "\n".join(lines)
+
+    def set_builtin_result(self, type_, value): # builtins publish their result to this func and its caller 
+        slot = self.result_slot_[type_]
+        self.frame_.blocks_[0][slot] = Value(value, type_) # add to current func
+        if (self.frame_.caller_ != None): # add to caller func
+            self.frame_.caller_.blocks_[0][slot] = Value(value, type_)
+
+
+    def funccall_def(self, callee, args):
+        if (callee[0] == self.PUSH_MEMBER_OP): # method call 
+            cell = self.get_member(callee)
+            if (cell.type_ != self.FUNC_DEF):
+                super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
+            self.funccall_var(cell, args, self.frame_.blocks_[callee[2]][callee[3]])
             return
-
-        item = self.funccall_stack_.pop()
-        recent_ip = item[0]
-        caller_func = item[1]
-        if (self.return_type_stack_): # not in main
-            ret_type = self.return_type_stack_.pop()
-
-        if (len(p) == 1): # 'return' statement
-            self.ip_ = self.jump_from_return(recent_ip)
-            if (ret_type != self.VOID_DEF): # return default values 
-                if (ret_type == self.STRING_DEF):
-                    self.results = ""
-                    self.scope_stack_[-1][1][0]["results"] = ["", self.STRING_DEF]
-                    self.scope_stack_[-2][1][0]["results"] = ["", self.STRING_DEF]
-                elif (ret_type == self.INT_DEF):
-                    self.resulti = 0
-                    self.scope_stack_[-1][1][0]["resulti"] = [0, self.INT_DEF]
-                    self.scope_stack_[-2][1][0]["resulti"] = [0, self.INT_DEF]
-                elif (ret_type == self.BOOL_DEF):
-                    self.resultb = "False"
-                    self.scope_stack_[-1][1][0]["resultb"] = ["False", self.BOOL_DEF]
-                    self.scope_stack_[-2][1][0]["resultb"] = ["False", self.BOOL_DEF]
-                elif (ret_type == self.FUNC_DEF):
-                    self.resultf = "default"
-                    self.scope_stack_[-1][1][0]["resultf"] = [self.resultf, self.FUNC_DEF]
-                    self.scope_stack_[-2][1][0]["resultf"] = [self.resultf, self.FUNC_DEF]
-                elif (ret_type == self.OBJECT_DEF):
-                    self.resulto = {}
-                    self.scope_stack_[-1][1][0]["resulto"] = [self.resulto, self.OBJECT_DEF]
-                    self.scope_stack_[-2][1][0]["resulto"] = [self.resulto, self.OBJECT_DEF]
-
-        elif (p[1] in self.operators): # return statement with expression
-            result = self.handle_operation(p)
-            if (self.check_type(result) == ret_type):
-                if (ret_type == self.STRING_DEF):
-                    self.results = result
-                    self.scope_stack_[-1][1][0]["results"] = [result, self.STRING_DEF]
-                    self.scope_stack_[-2][1][0]["results"] = [result, self.STRING_DEF]
-                elif (ret_type == self.INT_DEF):
-                    self.resulti = result
-                    self.scope_stack_[-1][1][0]["resulti"] = [result, self.INT_DEF]
-                    self.scope_stack_[-2][1][0]["resulti"] = [result, self.INT_DEF]
-                elif (ret_type == self.BOOL_DEF):
-                    self.resultb = result
-                    self.scope_stack_[-1][1][0]["resultb"] = [result, self.BOOL_DEF]
-                    self.scope_stack_[-2][1][0]["resultb"] = [result, self.BOOL_DEF]
-            else:
+        cell = self.find(callee)
+        if (cell != None): # calling a function variable 
+            if (cell.type_ != self.FUNC_DEF):
                 super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
-            self.ip_ = self.jump_from_return(recent_ip)
-
-        elif (self.is_in_scope(p[1])): # return a variable 
-            scope = self.get_scope(p[1])
-            if ("." in p[1]): # retuning a mem obj
-                obj = p[1].split(".")[0]
-                mem = p[1].split(".")[1]
-                var = self.scope_stack_[-1][1][scope][obj][0][mem]
-            else:   
-                var = self.scope_stack_[-1][1][scope][p[1]]
-            if (ret_type == var[1]): # types match 
-                if (ret_type == self.STRING_DEF):
-                    self.results = var[0]
-                    self.scope_stack_[-1][1][0]["results"] = [var[0], self.STRING_DEF]
-                    self.scope_stack_[-2][1][0]["results"] = [var[0], self.STRING_DEF]
-                elif (ret_type == self.INT_DEF):
-                    self.resulti = var[0]
-                    self.scope_stack_[-1][1][0]["resulti"] = [var[0], self.INT_DEF]
-                    self.scope_stack_[-2][1][0]["resulti"] = [var[0], self.INT_DEF]
-                elif (ret_type == self.BOOL_DEF):
-                    self.resultb = var[0]
-                    self.scope_stack_[-1][1][0]["resultb"] = [var[0], self.BOOL_DEF]
-                    self.scope_stack_[-2][1][0]["resultb"] = [var[0], self.BOOL_DEF]
-                elif (ret_type == self.FUNC_DEF):
-                    self.resultf = var[0]
-                    self.scope_stack_[-1][1][0]["resultf"] = [var[0], self.FUNC_DEF]
-                    self.scope_stack_[-2][1][0]["resultf"] = [var[0], self.FUNC_DEF]
-                elif (ret_type == self.OBJECT_DEF):
-                    self.resulto = var[0]
-                    self.scope_stack_[-1][1][0]["resulto"] = [var[0], self.OBJECT_DEF]
-                    self.scope_stack_[-2][1][0]["resulto"] = [var[0], self.OBJECT_DEF]
+            self.funccall_var(cell, args, None)
+            return
+        if (callee[4] == None):
+            super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
+        self.funccall_user_def(callee[4], args)
+
+    def funccall_direct_def(self, func_index, args, refs): # call the type checker already proved 
+        sig = self.signatures_[func_index]
+        block = [None] * sig.size_
+        slots = sig.slots_
+        for index, arg in enumerate(args):
+            if (refs[index]): # pass by reference 
+                block[slots[index]] = self.argument(arg)
             else:
-                super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
-            self.ip_ = self.jump_from_return(recent_ip)
-
-        elif (p[1] in self.func_dict_): # return a function
-            if (ret_type == self.FUNC_DEF):
-                self.resultf = self.func_dict_[p[1]]
-                self.scope_stack_[-1][1][0]["resultf"] = [self.func_dict_[p[1]], self.FUNC_DEF]
-                self.scope_stack_[-2][1][0]["resultf"] = [self.func_dict_[p[1]], self.FUNC_DEF]
-            else: 
-                 super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
-            self.ip_ = self.jump_from_return(recent_ip)
-
-        else: # return a constant 
-            type_ = self.check_type(p[1])
-            if (ret_type == type_): 
-                if (ret_type == self.STRING_DEF):
-                    self.results = p[1]
-                    self.scope_stack_[-1][1][0]["results"] = [p[1], self.STRING_DEF]
-                    self.scope_stack_[-2][1][0]["results"] = [p[1], self.STRING_DEF]
-                elif (ret_type == self.INT_DEF):
-                    self.resulti = p[1]
-                    self.scope_stack_[-1][1][0]["resulti"] = [p[1], self.INT_DEF]
-                    self.scope_stack_[-2][1][0]["resulti"] = [p[1], self.INT_DEF]
-                elif (ret_type == self.BOOL_DEF):
-                    self.resultb = p[1]
-                    self.scope_stack_[-1][1][0]["resultb"] = [p[1], self.BOOL_DEF]
-                    self.scope_stack_[-2][1][0]["resultb"] = [p[1], self.BOOL_DEF]
-                
+                value = self.load(arg)
+                block[slots[index]] = Value(value.value_, value.type_)
+        self.push_frame(sig.name_, sig.return_type_, block)
+        self.current_func_ = sig.name_
+        self.ip_ = func_index
+
+    def tail_call_def(self, func_index, args, refs): # like a proved call, but the callee takes over this frame 
+        sig = self.signatures_[func_index]
+        block = [None] * sig.size_
+        slots = sig.slots_
+        for index, arg in enumerate(args):
+            if (refs[index]): # pass by reference 
+                block[slots[index]] = self.argument(arg)
             else:
-                super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
-            self.ip_ = self.jump_from_return(recent_ip)
-
-        self.scope_stack_.pop() # remove this func stack
-        self.current_func_ = item[1]
-
-    def endfunc_def(self):
-        if (self.funccall_stack_):
-            item = self.funccall_stack_.pop()
-            recent_ip = item[0]
-            caller_func = item[1]
-            ind_caller_func = self.index_of_func(caller_func)
-            line_num = self.func_dict_[self.current_func_] 
-            line = self.program_statements_[line_num]
-            ret_type = line[len(line)-1] # extract return type 
-            if (ret_type == self.INT_DEF):
-                if ("resulti" not in self.scope_stack_[-1][1]): # check if int was returned
-                    self.scope_stack_[ind_caller_func][1][0]["resulti"] = [0, self.INT_DEF]
-                    self.return_type_stack_.pop()
-
-            elif (ret_type == self.STRING_DEF): # check if string was returned
-                if ("results" not in self.scope_stack_[-1][1]):
-                    self.scope_stack_[ind_caller_func][1][0]["results"] = ["", self.STRING_DEF]
-                    self.return_type_stack_.pop()
-
-            elif (ret_type == self.BOOL_DEF): # check if bool was returned
-                if ("resultb" not in self.scope_stack_[-1][1]):
-                    self.scope_stack_[ind_caller_func][1][0]["resultb"] = ["False", self.BOOL_DEF]
-                    self.return_type_stack_.pop()
-
-            elif (ret_type == self.FUNC_DEF): # check if func was returned
-                if ("resultf" not in self.scope_stack_[-1][1]):
-                    self.scope_stack_[ind_caller_func][1][0]["resultf"] = ["default", self.FUNC_DEF]
-                    self.return_type_stack_.pop()
-
-            elif (ret_type == self.OBJECT_DEF): # check if object was returned
-                if ("resulto" not in self.scope_stack_[-1][1]):
-                    self.scope_stack_[ind_caller_func][1][0]["resulto"] = [{}, self.OBJECT_DEF]
-                    self.return_type_stack_.pop()
-
-            else:
-                self.return_type_stack_.pop()
-
-            self.scope_stack_.pop() # remove this func stack
-            self.current_func_ = item[1]
-            self.ip_ = self.jump_from_return(recent_ip)
+                value = self.load(arg)
+                block[slots[index]] = Value(value.value_, value.type_)
+        frame = self.frame_ # caller and return ip stay, the callee returns where this func would have 
+        frame.func_name_ = sig.name_
+        frame.blocks_.clear()
+        frame.blocks_.append(block)
+        self.current_func_ = sig.name_
+        self.ip_ = func_index
+        if (self.profiler_ != None):
+            self.profiler_.tail(sig.name_)
+        if (self.budget_ != None):
+            self.budget_.tail()
+
+    def funccall_user_def(self, func_index, args):
+        self.call_function(func_index, None, args, None)
+
+    def funccall_var(self, cell, args, this_cell):
+        value = cell.value_
+        if (value == "default"): # func var that was never assigned 
+            return
+        if (isinstance(value, list)): # lambda, with its captured vars 
+            self.call_function(value[0], value[1], args, this_cell)
         else:
-            self.terminated_ = True 
+            self.call_function(value, None, args, this_cell)
 
-    def var_def(self, p):
-        if (len(p) <= 2):
+    def call_function(self, func_index, captured, args, this_cell):
+        sig = self.signatures_[func_index]
+        if (not sig.valid_ or sig.arity_ != len(args)): # invalid header, or num of parameters do not match 
             super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
-        scope = self.get_current_scope() # retrive current env of this func 
-        for var in p[2:]: # check for valid variable names 
-            if (not var[0].isalpha()):
-                super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
-            if ("." in var):
+        cells = [self.argument(arg) for arg in args] # extract arg from caller & check if valid 
+        block = [None] * sig.size_
+        if (captured != None): # lambda runs in a copy of the vars it captured, made only for the vars it may change 
+            memo = {} # objects captured together keep sharing their Objects 
+            for capture, cell in zip(sig.captures_, captured):
+                if (cell == None or capture[3] == self.SHARE_CAPTURE):
+                    block[capture[2]] = cell
+                elif (capture[3] == self.COPY_CAPTURE):
+                    block[capture[2]] = Value(cell.value_, cell.type_)
+                else:
+                    block[capture[2]] = copy.deepcopy(cell, memo)
+        kinds = sig.kinds_
+        for index, cell in enumerate(cells):
+            if (kinds[index] == self.INVALID_PARAM): # invalid parameter type 
                 super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
+            if (cell.type_ != sig.types_[index]): # arg does not match the param type 
+                super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
+            if (kinds[index] == self.REF_PARAM): # pass by reference, the param is the caller's cell 
+                block[sig.slots_[index]] = cell
+            else: # pass by value, objects share the caller's Object 
+                block[sig.slots_[index]] = Value(cell.value_, cell.type_)
+        if (this_cell != None): # method call, add "this"
+            block[self.slot_def_["this"]] = this_cell
+        self.push_frame(sig.name_, sig.return_type_, block)
+        self.current_func_ = sig.name_
+        self.ip_ = func_index # continue at the first line of its body 
+
+    def signature(self, ins): # Signature of a func or lambda header, None for other lines 
+        if (ins[0] == self.FUNC_OP):
+            name, params, return_type_, slots, size, captures = ins[1], ins[2], ins[3], ins[4], ins[5], ()
+        elif (ins[0] == self.LAMBDA_OP):
+            name, params, return_type_, slots, size, captures = self.LAMBDA_DEF, ins[1], ins[2], ins[4], ins[6], ins[5]
+        else:
+            return None
+        valid = return_type_ in self.return_def_
+        parsed = []
+        for param in params:
+            param_def = param.split(":")
+            if (len(param_def) != 2 or param_def[0] in [p[0] for p in parsed]): # malformed or repeated param 
+                valid = False
+                param_def = (param_def[0], None)
+            if (param_def[1] in self.param_def_):
+                parsed.append((param_def[0], param_def[1], self.VALUE_PARAM))
+            elif (param_def[1] == self.OBJECT_DEF):
+                parsed.append((param_def[0], param_def[1], self.OBJECT_PARAM))
+            elif (param_def[1] in self.param_ref_def_):
+                parsed.append((param_def[0], param_def[1][3:], self.REF_PARAM))
+            else:
+                parsed.append((param_def[0], None, self.INVALID_PARAM))
+        return Signature(name, parsed, return_type_, slots, size, captures, valid)
 
-        if (p[1] == self.INT_DEF):
-            for var in p[2:]:
-                if (self.is_in_scope(var)):
-                    sc = self.get_scope(var)
-                    if (scope == sc): # var exists in the same scope (redefinition)
-                        super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
-                self.scope_stack_[-1][1][scope][var] = [0, self.INT_DEF]
-
-        elif (p[1] == self.STRING_DEF):
-            for var in p[2:]:
-                if (self.is_in_scope(var)):
-                    sc = self.get_scope(var)
-                    if (scope == sc): # var exists in the same scope (redefinition)
-                        super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
-                self.scope_stack_[-1][1][scope][var] = ["", self.STRING_DEF]
-
-        elif (p[1] == self.BOOL_DEF):
-            for var in p[2:]:
-                if (self.is_in_scope(var)):
-                    sc = self.get_scope(var)
-                    if (scope == sc): # var exists in the same scope (redefinition)
-                        super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
-                self.scope_stack_[-1][1][scope][var] = ["False", self.BOOL_DEF]
-
-        elif (p[1] == self.FUNC_DEF):
-            for var in p[2:]:
-                if (self.is_in_scope(var)):
-                    sc = self.get_scope(var)
-                    if (scope == sc): # var exists in the same scope (redefinition)
-                        super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
-                self.scope_stack_[-1][1][scope][var] = ["default", self.FUNC_DEF]
-
-        elif (p[1] == self.OBJECT_DEF):
-            for var in p[2:]:
-                if (self.is_in_scope(var)):
-                    sc = self.get_scope(var)
-                    if (scope == sc): # var exists in the same scope (redefinition)
-                        super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
-                self.scope_stack_[-1][1][scope][var] = [{}, self.OBJECT_DEF]
-
+    def push_frame(self, func_name, return_type_, block):
+        if (self.free_frames_):
+            frame = self.free_frames_.pop()
         else:
+            frame = Frame()
+        frame.func_name_ = func_name
+        frame.blocks_.append(block)
+        frame.caller_ = self.frame_
+        frame.return_ip_ = self.ip_ + 1
+        frame.return_type_ = return_type_
+        frame.return_slot_ = self.result_slot_.get(return_type_)
+        self.frame_ = frame
+        if (self.profiler_ != None):
+            self.profiler_.enter(func_name)
+        if (self.budget_ != None and frame.caller_ != None): # main is not a call 
+            self.budget_.call(self.ip_)
+
+    def return_def(self, code):
+        if (self.frame_.caller_ == None): # we are trying to return in main
+            if (code != None): # not just a 'return'
+                super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
+            self.terminated_ = True
+            return
+        if (code == None): # return default values 
+            self.leave_function(self.default_result(self.frame_.return_type_))
+            return
+        result = code()
+        if (result.type_ != self.frame_.return_type_):
             super().error(ErrorType.TYPE_ERROR, line_num = self.ip_)
+        self.leave_function(Value(result.value_, result.type_))
+
+    def return_typed_def(self, code): # return from a func, the value has its return type 
+        result = code()
+        self.leave_function(Value(result.value_, result.type_))
+
+    def default_result(self, ret_type): # value a func returns without a return value, None for void 
+        if (ret_type == self.VOID_DEF):
+            return None
+        elif (ret_type == self.OBJECT_DEF):
+            return Value(Object(self.root_shape_), ret_type)
+        return Value(self.default_def_[ret_type], ret_type)
+
+    def leave_function(self, result): # hand the call's result to the caller's result var and resume the caller 
+        frame = self.frame_
+        self.frame_ = frame.caller_
+        if (self.profiler_ != None):
+            self.profiler_.leave()
+        if (self.budget_ != None):
+            self.budget_.ret()
+        if (result != None):
+            self.frame_.blocks_[0][frame.return_slot_] = result
+        self.current_func_ = self.frame_.func_name_
+        self.ip_ = frame.return_ip_ - 1 # resume right after the funccall 
+        frame.blocks_.clear()
+        frame.caller_ = None
+        if (len(self.free_frames_) < self.FREE_FRAMES_MAX):
+            self.free_frames_.append(frame)
 
-    def locate_endlambda(self):
-        lambda_count = 0
-        endlambda_count = 0 
-        for index, p in enumerate(self.program_statements_[self.ip_+1:]):
-            if (len(p) == 0):
-                continue 
-            elif (p[0] == "lambda"):
-                lambda_count += 1
-            elif (p[0] == "endlambda"):
-                if (lambda_count == endlambda_count):
-                    return self.ip_ + index + 1
-                endlambda_count += 1
-
-    def lambda_def(self, p):
-        if (":" in p[len(p)-1]):
-            super().error(ErrorType.NAME_ERROR, line_num = self.ip_)
-        captured_var = []
-        scope = self.get_current_scope()
-        captured_var.append({})
-        ind = 0
-        while (ind <= scope):
-            dict_copy = copy.deepcopy(self.scope_stack_[-1][1][ind])
-            captured_var[0].update(dict_copy)
-            ind += 1
-        self.lambda_stack_.append([self.ip_, captured_var])
-        self.resultf = [copy.deepcopy(self.lambda_stack_[-1]), self.FUNC_DEF]
-        self.scope_stack_[-1][1][0]["resultf"] = self.resultf # add to scope stack
-        self.ip_ = self.locate_endlambda() # find endlamda and go there
-        return
-
-    def endlambda_def(self):
-        self.endfunc_def()
-                
-    def interpret_statement(self):
-        p = self.program_statements_[self.ip_]
-        if (p != []): # not an empty line
-            if (p[0] == self.FUNC_DEF): # either main or user defined function 
-                self.func_def(p)
-            
-            elif (p[0] == self.FUNCCALL_DEF): # calling another function 
-                self.funccall_def(p)
-
-            elif (p[0] == self.ASSIGN_DEF): # assigning a variable to a value 
-                self.assign_def(p)
-
-            elif (p[0] == self.WHILE_DEF): # handle control flow 
-                self.while_def(p)
-
-            elif (p[0] == self.ENDWHILE_DEF): # end of control flow
-                self.endwhile_def()
-
-            elif (p[0] == self.IF_DEF): 
-                self.if_def(p)
-
-            elif (p[0] == self.ELSE_DEF): 
-                self.else_def(p)
-
-            elif (p[0] == self.ENDIF_DEF): 
-                self.endif_def(p)
-
-            elif (p[0] == self.RETURN_DEF): # return statement
-                self.return_def(p)
-
-            elif (p[0] == self.ENDFUNC_DEF): # end of function
-                self.endfunc_def()
-
-            elif (p[0] == self.VAR_DEF): # variable definition
-                self.var_def(p)
+    def endfunc_def(self):
+        if (self.frame_.caller_ != None): # nothing was returned, so the caller gets the default 
+            self.leave_function(self.default_result(self.frame_.return_type_))
+        else:
+            self.terminated_ = True 
 
-            elif (p[0] == self.LAMBDA_DEF): # lambda definiton
-                self.lambda_def(p)
+    def while_def(self, code, target, size):
+        if (self.evaluate_condition(code)): # go into the while loop
+            self.frame_.blocks_.append([None] * size) # create new scope for while
+        else: # condition was not met 
+            self.ip_ = target - 1
+
+    def endwhile_def(self, target):
+        self.ip_ = target - 1
+        self.frame_.blocks_.pop()
+
+    def if_def(self, code, target, size):
+        if (not self.evaluate_condition(code)): # if condition was not met 
+            self.ip_ = target - 1
+        self.frame_.blocks_.append([None] * size) # create new scope for if or else 
+
+    def jump_def(self, target):
+        self.ip_ = target - 1
+
+    def endif_def(self):
+        self.frame_.blocks_.pop()
+
+    def lambda_def(self, params, return_type_, target, param_slots, captures, size):
+        frame = self.frame_.blocks_
+        captured = []
+        memo = {}
+        for capture in captures: # values as they are now, later changes to the vars are not seen 
+            cell = frame[capture[0]][capture[1]]
+            if (cell == None):
+                captured.append(None)
+            elif (capture[3] == self.DEEP_CAPTURE):
+                captured.append(copy.deepcopy(cell, memo))
+            else: # ints, strings, bools and funcs are never changed in place 
+                captured.append(Value(cell.value_, cell.type_))
+        frame[0][self.result_slot_[self.FUNC_DEF]] = Value([self.ip_, captured], self.FUNC_DEF) # add to scope stack
+        self.ip_ = target - 1 # skip the body, it runs when the lambda is called 
+
+    def instrumented_statements(self): # the run loop with whichever of the budget, profiler and step sampler are set 
+        code = self.code_
+        budget = self.budget_
+        profiler = self.profiler_
+        sampler = self.sampler_ if (self.sampler_ != None and self.sampler_.every_ != None) else None # a timer sampler needs no hook 
+        allocates = self.allocations() if (budget != None) else None
+        check = budget.next_check() if (budget != None) else None
+        countdown = sampler.every_ if (sampler != None) else None
+        steps = 0
+        allocations = 0
+        try:
+            while (not self.terminated_):
+                ip = self.ip_
+                if (budget != None):
+                    steps += 1
+                    allocations += allocates[ip]
+                    if (steps >= check):
+                        budget.steps_ = steps
+                        check = budget.check(self)
+                if (sampler != None):
+                    countdown -= 1
+                    if (countdown == 0):
+                        sampler.sample(self)
+                        countdown = sampler.every_
+                ins = code[ip]
+                if (profiler != None):
+                    profiler.begin(ip)
+                    ins[0](*ins[1])
+                    profiler.end()
+                else:
+                    ins[0](*ins[1])
+                self.ip_ += 1
+        finally:
+            if (budget != None):
+                budget.steps_ = steps
+                budget.line_allocations_ = allocations
+
+    def call_stack(self): # (func name, line num) of each call in progress, main first, for the sampler 
+        stack = []
+        line = self.ip_
+        frame = self.frame_
+        while (frame != None):
+            stack.append((frame.func_name_, line))
+            line = frame.return_ip_ - 1 # the caller is at its funccall line 
+            frame = frame.caller_
+        stack.reverse()
+        return stack
+
+    def allocations(self): # vars and lambdas each line makes, for metering 
+        counts = []
+        for ins in self.bytecode_:
+            if (ins[0] == self.VAR_OP):
+                counts.append(len(ins[2]))
+            elif (ins[0] == self.LAMBDA_OP):
+                counts.append(1)
+            else:
+                counts.append(0)
+        return counts
+
+    def heap_size(self): # approximate bytes held by the vars, objects and captured lambdas of every frame 
+        cells = []
+        frame = self.frame_
+        while (frame != None):
+            for block in frame.blocks_:
+                cells.extend(block)
+            frame = frame.caller_
+        seen = set() # cells and objects shared by several vars are counted once 
+        size = 0
+        while (cells):
+            cell = cells.pop()
+            if (cell == None or id(cell) in seen):
+                continue
+            seen.add(id(cell))
+            size += self.CELL_BYTES
+            value = cell.value_
+            if (isinstance(value, str)):
+                size += len(value)
+            elif (isinstance(value, int)): # ints grow without bound too 
+                size += value.bit_length() // 8
+            elif (isinstance(value, Object) and id(value) not in seen):
+                seen.add(id(value))
+                size += self.CELL_BYTES
+                cells.extend(value.cells_)
+            elif (isinstance(value, list)): # lambda, with its captured vars 
+                cells.extend(value[1])
+        return size
+
+    def guard_operators(self): # with a heap limit, string + and int * check there is room for their result before making it 
+        self.op_def_ = type(self).op_def_
+        if (self.budget_ != None and self.budget_.max_heap_ != None):
+            self.op_def_ = dict(self.op_def_)
+            self.op_def_["+"] = dict(self.op_def_["+"])
+            self.op_def_["+"][self.STRING_DEF] = (self.budget_.guard(self, operator.add, self.budget_.concat_size), self.STRING_DEF)
+            self.op_def_["*"] = dict(self.op_def_["*"])
+            self.op_def_["*"][self.INT_DEF] = (self.budget_.guard(self, operator.mul, self.budget_.product_size), self.INT_DEF)
+
+    def output(self, v):
+        if (self.output_sink_ != None):
+            self.output_sink_.write(v)
+        else:
+            super().output(v)
 
-            elif (p[0] == self.ENDLAMBDA_DEF):
-                self.endlambda_def()
+    def flush_output(self): # lines still buffered in the sink are written out 
+        if (self.output_sink_ != None):
+            self.output_sink_.flush()
 
-        new_ip = self.ip_ + 1
-        return new_ip
+    def get_input(self):
+        if (self.input_source_ != None):
+            line = self.input_source_.readline()
+        else:
+            line = super().get_input()
+        if (line == None): # every input line was read 
+            super().error(ErrorType.FAULT_ERROR, line_num = self.ip_)
+        return line
+
+    def write_profile(self): # report of the run, as a table on stderr or as JSON in the file trace_output names 
+        self.profiler_.finish()
+        if (isinstance(self.trace_output_, str)):
+            with open(self.trace_output_, "w") as f:
+                f.write(self.profiler_.to_json())
+        else:
+            sys.stderr.write(self.profiler_.table())
 
     def locate_main(self):
         self.ip_ = self.func_dict_["main"]
@@ -1066,14 +1291,46 @@ class Interpreter(InterpreterBase):
 
     # program is an array of strings 
     def run(self, program):
-        self.program_statements_ = self.tokenize(program)
+        if (self.cache_ != None): # compiled by an earlier run, or by another process sharing the cache 
+            self.reset_all_variables()
+            self.run_bytecode(self.cache_.bytecode(self, program))
+        else:
+            self.run_bytecode(self.compile(program))
+
+    def run_bytecode(self, bytecode):
+        self.bytecode_ = bytecode[1]
+        self.func_dict_ = bytecode[2]
+        self.consts_ = [Value(const[1], const[0]) for const in bytecode[3]]
+        self.program_statements_ = bytecode[4]
+        self.root_shape_ = Shape({}) # shapes of earlier programs are dropped, the inline caches linked below start empty too 
+        self.signatures_ = [self.signature(ins) for ins in self.bytecode_]
+        self.guard_operators()
+        self.code_ = [(self.op_table_[ins[0]], self.link(ins)) for ins in self.bytecode_] # bind each instruction to its handler 
         self.ip_ = self.locate_main()
-        self.func_dict_["main"] = self.ip_
         self.current_func_ = "main"
-        self.scope_stack_.append([self.current_func_, []]) # create new stack entry for main
-        self.scope_stack_[0][1].append({}) # create var dict for main
+        self.release_frames() # main is the bottom frame, even on a reused interpreter 
+        self.profiler_ = Profiler(self.program_statements_) if (self.trace_output_) else None
+        self.push_frame(self.current_func_, self.VOID_DEF, [None] * self.signatures_[self.ip_].size_) # create frame with var slots for main
         self.terminated_ = False
-
-        while (not self.terminated_):
-            self.ip_ = self.interpret_statement()
-
+        if (self.sampler_ != None):
+            self.sampler_.start(self)
+        if (self.budget_ != None):
+            self.budget_.start()
+
+        code = self.code_
+        try:
+            if (self.budget_ != None or self.profiler_ != None or (self.sampler_ != None and self.sampler_.every_ != None)): # a separate loop, so plain runs pay nothing for the hooks 
+                self.instrumented_statements()
+            else:
+                while (not self.terminated_):
+                    ins = code[self.ip_]
+                    ins[0](*ins[1])
+                    self.ip_ += 1
+        finally: # output printed before an error is not lost 
+            self.flush_output()
+            if (self.profiler_ != None):
+                self.write_profile()
+            if (self.sampler_ != None):
+                self.sampler_.stop()
+            if (self.budget_ != None):
+                self.budget_.finish(self)
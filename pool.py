@@ -0,0 +1,38 @@
+import threading
+import importlib
+import contextlib
+
+class InterpreterPool: # ready interpreters of one version, which threads check out and give back
+    def __init__(self, version = 3, size = 8, **options):
+        self.module_ = importlib.import_module("interpreterv" + str(version))
+        self.options_ = options # constructor args for new interpreters, e.g. console_output
+        self.size_ = size # most idle interpreters kept
+        self.idle_ = []
+        self.lock_ = threading.Lock()
+
+    def acquire(self, input = None, output_sink = None, input_source = None): # an interpreter only the caller uses until it is released
+        with self.lock_:
+            interpreter = self.idle_.pop() if (self.idle_) else None
+        if (interpreter == None):
+            interpreter = self.module_.Interpreter(**self.options_)
+        interpreter.input = input
+        interpreter.output_sink_ = output_sink
+        interpreter.input_source_ = input_source
+        return interpreter
+
+    def release(self, interpreter):
+        interpreter.reset() # output log, input cursor and error of the base
+        interpreter.reset_all_variables()
+        interpreter.output_sink_ = None
+        interpreter.input_source_ = None
+        with self.lock_:
+            if (len(self.idle_) < self.size_):
+                self.idle_.append(interpreter)
+
+    @contextlib.contextmanager
+    def interpreter(self, input = None, output_sink = None, input_source = None): # with pool.interpreter(...) as interpreter: releases it afterwards
+        interpreter = self.acquire(input, output_sink, input_source)
+        try:
+            yield interpreter
+        finally:
+            self.release(interpreter)
@@ -0,0 +1,134 @@
+import time
+import json
+import threading
+
+class Profiler: # hit count, self time and cumulative time of each line and each func of a Brewin program
+    def __init__(self, statements):
+        self.source_ = [" ".join(p) for p in statements] # text of each line, for the report
+        self.line_hits_ = {}
+        self.line_self_ = {}
+        self.line_cum_ = {} # time spent in calls made by the line, its self time is added in the report
+        self.line_active_ = {} # calls made by the line that have not returned, recursion is only timed once
+        self.func_hits_ = {}
+        self.func_self_ = {}
+        self.func_cum_ = {}
+        self.func_active_ = {}
+        self.stack_ = [] # [func name, line num of the call, start time] of each call that has not returned
+        self.line_ = None # line num of the statement running
+        self.func_ = None # func the statement running is in
+        self.start_ = 0
+
+    def begin(self, line): # before a statement runs
+        self.line_ = line
+        self.func_ = self.stack_[-1][0] if (self.stack_) else None
+        self.start_ = time.perf_counter()
+
+    def end(self): # after it ran, its time is its line's and its func's self time
+        elapsed = time.perf_counter() - self.start_
+        line = self.line_
+        self.line_hits_[line] = self.line_hits_.get(line, 0) + 1
+        self.line_self_[line] = self.line_self_.get(line, 0) + elapsed
+        if (self.func_ != None):
+            self.func_self_[self.func_] = self.func_self_.get(self.func_, 0) + elapsed
+
+    def enter(self, name): # a call from the statement running
+        line = self.line_
+        self.func_hits_[name] = self.func_hits_.get(name, 0) + 1
+        self.func_active_[name] = self.func_active_.get(name, 0) + 1
+        if (line != None):
+            self.line_active_[line] = self.line_active_.get(line, 0) + 1
+        self.stack_.append([name, line, time.perf_counter()])
+
+    def leave(self): # the innermost call returned
+        name, line, start = self.stack_.pop()
+        elapsed = time.perf_counter() - start
+        self.func_active_[name] -= 1
+        if (self.func_active_[name] == 0): # outermost call of a recursive func
+            self.func_cum_[name] = self.func_cum_.get(name, 0) + elapsed
+        if (line != None):
+            self.line_active_[line] -= 1
+            if (self.line_active_[line] == 0):
+                self.line_cum_[line] = self.line_cum_.get(line, 0) + elapsed
+
+    def tail(self, name): # the innermost call is replaced by a call to name, which returns to the same line
+        line = self.stack_[-1][1]
+        self.leave()
+        current = self.line_
+        self.line_ = line
+        self.enter(name)
+        self.line_ = current
+
+    def finish(self): # program ended, or stopped with an error inside calls
+        while (self.stack_):
+            self.leave()
+
+    def lines(self): # a row for each line that ran, most self time first
+        rows = []
+        for line, hits in self.line_hits_.items():
+            rows.append({"line": line, "hits": hits, "self": self.line_self_[line], "cumulative": self.line_self_[line] + self.line_cum_.get(line, 0),
+                         "source": self.source_[line] if (line < len(self.source_)) else ""})
+        return sorted(rows, key = lambda row: row["self"], reverse = True)
+
+    def funcs(self): # a row for each func that was called, most self time first
+        rows = []
+        for name, hits in self.func_hits_.items():
+            rows.append({"func": name, "hits": hits, "self": self.func_self_.get(name, 0), "cumulative": self.func_cum_.get(name, 0)})
+        return sorted(rows, key = lambda row: row["self"], reverse = True)
+
+    def to_json(self):
+        return json.dumps({"funcs": self.funcs(), "lines": self.lines()}, indent = 1)
+
+    def table(self): # text report, funcs then lines, times in milliseconds
+        out = ["func".ljust(24) + "hits".rjust(10) + "self ms".rjust(12) + "cum ms".rjust(12)]
+        for row in self.funcs():
+            out.append(str(row["func"]).ljust(24) + str(row["hits"]).rjust(10) + ("%.3f" % (row["self"] * 1000)).rjust(12) + ("%.3f" % (row["cumulative"] * 1000)).rjust(12))
+        out.append("")
+        out.append("line".rjust(6) + "hits".rjust(10) + "self ms".rjust(12) + "cum ms".rjust(12) + "  source")
+        for row in self.lines():
+            out.append(str(row["line"]).rjust(6) + str(row["hits"]).rjust(10) + ("%.3f" % (row["self"] * 1000)).rjust(12) +
+                       ("%.3f" % (row["cumulative"] * 1000)).rjust(12) + "  " + row["source"])
+        return "\n".join(out) + "\n"
+
+class Sampler: # counts of the Brewin call stacks seen at regular times, written as collapsed stacks for flamegraph tools
+    def __init__(self, path = None, interval = 0.005, every = None, lines = False):
+        self.path_ = path # file the collapsed stacks are written to when a run ends, None keeps them in counts_ only
+        self.interval_ = interval # seconds between samples taken by the timer thread
+        self.every_ = every # statements between samples taken by the run loop, which replaces the timer thread
+        self.lines_ = lines # frames named func:line instead of func
+        self.counts_ = {} # collapsed stack to the num of samples that saw it
+        self.thread_ = None
+        self.stop_ = threading.Event()
+
+    def start(self, interpreter): # a run begins, the timer thread samples it until stop
+        if (self.every_ != None):
+            return
+        self.stop_.clear()
+        self.thread_ = threading.Thread(target = self.sample_until_stopped, args = (interpreter,), daemon = True)
+        self.thread_.start()
+
+    def sample_until_stopped(self, interpreter):
+        while (not self.stop_.wait(self.interval_)):
+            self.sample(interpreter)
+
+    def stop(self): # the run ended, the samples so far are written out
+        if (self.thread_ != None):
+            self.stop_.set()
+            self.thread_.join()
+            self.thread_ = None
+        if (self.path_ != None):
+            with open(self.path_, "w") as f:
+                f.write(self.collapsed())
+
+    def sample(self, interpreter):
+        try:
+            stack = interpreter.call_stack()
+        except (AttributeError, IndexError, KeyError, TypeError): # timer thread caught a call or return halfway, the sample is dropped
+            return
+        if (self.lines_):
+            key = ";".join(str(func) + ":" + str(line) for func, line in stack)
+        else:
+            key = ";".join(str(func) for func, line in stack)
+        self.counts_[key] = self.counts_.get(key, 0) + 1
+
+    def collapsed(self): # a "main;f;g count" line for each stack, the input of flamegraph.pl and speedscope
+        return "".join(key + " " + str(count) + "\n" for key, count in sorted(self.counts_.items()))
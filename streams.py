@@ -0,0 +1,167 @@
+import sys
+import collections
+import mmap
+import os
+
+class OutputSink: # where an interpreter's printed lines go, write gets one line without its newline
+    def write(self, line):
+        raise NotImplementedError
+
+    def flush(self):
+        return
+
+    def close(self):
+        self.flush()
+
+class StreamSink(OutputSink): # lines batched into few writes to any text stream, e.g. a file or pipe
+    def __init__(self, stream, flush_lines = 1024, flush_bytes = 65536):
+        self.stream_ = stream
+        self.flush_lines_ = flush_lines # lines held before a write, 1 writes every line
+        self.flush_bytes_ = flush_bytes # chars held before a write
+        self.buffer_ = []
+        self.size_ = 0 # chars in the buffer
+
+    def write(self, line):
+        self.buffer_.append(line)
+        self.size_ += len(line) + 1
+        if (len(self.buffer_) >= self.flush_lines_ or self.size_ >= self.flush_bytes_):
+            self.flush()
+
+    def flush(self):
+        if (self.buffer_):
+            self.buffer_.append("") # newline after the last line
+            self.stream_.write("\n".join(self.buffer_))
+            self.buffer_ = []
+            self.size_ = 0
+        self.stream_.flush()
+
+class StdoutSink(StreamSink): # buffered console output
+    def __init__(self, flush_lines = 1024, flush_bytes = 65536):
+        super().__init__(sys.stdout, flush_lines, flush_bytes)
+
+class FileSink(StreamSink): # buffered output to a file it opens, and closes when done
+    def __init__(self, path, append = False, flush_lines = 1024, flush_bytes = 65536):
+        super().__init__(open(path, "a" if (append) else "w"), flush_lines, flush_bytes)
+
+    def close(self):
+        self.flush()
+        self.stream_.close()
+
+class CallbackSink(OutputSink): # each line handed to a function as it is printed, e.g. to forward output to a socket or a log
+    def __init__(self, callback):
+        self.callback_ = callback
+
+    def write(self, line):
+        self.callback_(line)
+
+class RingBufferSink(OutputSink): # keeps only the last lines, so tests can check output with bounded memory
+    def __init__(self, capacity = 1024):
+        self.lines_ = collections.deque(maxlen = capacity)
+        self.count_ = 0 # lines written, including the ones dropped
+
+    def write(self, line):
+        self.lines_.append(line)
+        self.count_ += 1
+
+    def lines(self):
+        return list(self.lines_)
+
+    def dropped(self): # lines pushed out by newer ones
+        return self.count_ - len(self.lines_)
+
+class DiscardSink(OutputSink): # drops everything, for benchmarks
+    def __init__(self):
+        self.count_ = 0
+
+    def write(self, line):
+        self.count_ += 1
+
+class InputSource: # where an interpreter's input lines come from, readline gives one line without its newline or None once it runs out
+    def readline(self):
+        raise NotImplementedError
+
+    def read_remaining(self): # every line not read yet, joined by newlines into one string
+        raise NotImplementedError
+
+    def close(self):
+        return
+
+class StreamSource(InputSource): # lines of any text stream, e.g. stdin or a pipe, read ahead in large chunks
+    def __init__(self, stream, read_ahead = 65536):
+        self.stream_ = stream
+        self.read_ahead_ = read_ahead # chars read from the stream at a time
+        self.lines_ = collections.deque() # complete lines read ahead
+        self.partial_ = "" # start of a line whose newline has not been read yet
+        self.eof_ = False
+
+    def fill(self):
+        while (not self.lines_ and not self.eof_):
+            chunk = self.stream_.read(self.read_ahead_)
+            if (not chunk): # last line might have no newline
+                self.eof_ = True
+                if (self.partial_):
+                    self.lines_.append(self.partial_)
+                    self.partial_ = ""
+                return
+            lines = (self.partial_ + chunk).split("\n")
+            self.partial_ = lines.pop()
+            self.lines_.extend(lines)
+
+    def readline(self):
+        self.fill()
+        if (self.lines_):
+            return self.lines_.popleft()
+        return None
+
+    def read_remaining(self):
+        rest = self.partial_
+        if (not self.eof_):
+            rest += self.stream_.read()
+            self.eof_ = True
+        if (rest.endswith("\n")):
+            rest = rest[:-1]
+        if (rest):
+            self.lines_.append(rest)
+        text = "\n".join(self.lines_)
+        self.lines_.clear()
+        self.partial_ = ""
+        return text
+
+class FileSource(StreamSource): # lines of a file it opens, and closes when done
+    def __init__(self, path, read_ahead = 65536):
+        super().__init__(open(path, "r"), read_ahead)
+
+    def close(self):
+        self.stream_.close()
+
+class MmapSource(InputSource): # lines of a memory mapped file, decoded only when they are read
+    def __init__(self, path, encoding = "utf-8"):
+        self.file_ = open(path, "rb")
+        self.size_ = os.fstat(self.file_.fileno()).st_size
+        self.map_ = mmap.mmap(self.file_.fileno(), 0, access = mmap.ACCESS_READ) if (self.size_ > 0) else None # empty files cannot be mapped
+        self.encoding_ = encoding
+        self.pos_ = 0 # offset of the next line
+
+    def readline(self):
+        if (self.pos_ >= self.size_):
+            return None
+        end = self.map_.find(b"\n", self.pos_)
+        if (end == -1): # last line has no newline
+            end = self.size_
+        line = self.map_[self.pos_:end].decode(self.encoding_)
+        self.pos_ = end + 1
+        return line
+
+    def read_remaining(self):
+        if (self.pos_ >= self.size_):
+            return ""
+        data = self.map_[self.pos_:self.size_]
+        self.pos_ = self.size_
+        if (data.endswith(b"\n")):
+            data = data[:-1]
+        return data.decode(self.encoding_)
+
+    def close(self):
+        if (self.map_ != None):
+            self.map_.close()
+        self.file_.close()
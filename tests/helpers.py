@@ -0,0 +1,52 @@
+import os
+import glob
+import json
+import importlib
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+INPUT = ["21", "7"] # input lines of corpus programs that have no .input file
+
+LOOP = {1: ["func main", " assign x 0", " while == 1 1", "  assign x + x 1", " endwhile", "endfunc"],
+        2: ["func main void", " var int x", " while == 1 1", "  assign x + x 1", " endwhile", "endfunc"],
+        3: ["func main void", " var int x", " while == 1 1", "  assign x + x 1", " endwhile", "endfunc"]} # never ends
+RECURSE = {1: ["func f", " funccall f", " assign x 1", "endfunc", "func main", " funccall f", "endfunc"],
+           2: ["func f void", " funccall f", " var int x", "endfunc", "func main void", " funccall f", "endfunc"],
+           3: ["func f void", " funccall f", " var int x", "endfunc", "func main void", " funccall f", "endfunc"]} # not a tail call, so each call goes deeper
+COUNT = ["func fact n:int int", " if < n 1", "  return 1", " endif", " var int m", " assign m - n 1", " funccall fact m", " return * n resulti", "endfunc",
+         "func main void", " var int i", " assign i 6", " funccall fact i", " funccall print resulti", "endfunc"] # prints 720
+GROW = {1: ["func main", " assign s \"x\"", " while == 1 1", "  assign s + s s", " endwhile", "endfunc"],
+        2: ["func main void", " var string s", " assign s \"x\"", " while == 1 1", "  assign s + s s", " endwhile", "endfunc"],
+        3: ["func main void", " var string s", " assign s \"x\"", " while == 1 1", "  assign s + s s", " endwhile", "endfunc"]} # doubles a string forever
+SQUARE = {1: ["func main", " assign x 3", " while == 1 1", "  assign x * x x", " endwhile", "endfunc"],
+          2: ["func main void", " var int x", " assign x 3", " while == 1 1", "  assign x * x x", " endwhile", "endfunc"],
+          3: ["func main void", " var int x", " assign x 3", " while == 1 1", "  assign x * x x", " endwhile", "endfunc"]} # squares an int forever
+
+def interpreter(version, **options):
+    return importlib.import_module("interpreterv" + str(version)).Interpreter(console_output = False, **options)
+
+def programs(version): # (name, path) of each corpus program of a version
+    return [(os.path.basename(path)[:-len(".brewin")], path) for path in sorted(glob.glob(os.path.join(CORPUS, "v" + str(version), "*.brewin")))]
+
+def read_program(path):
+    return open(path).read().split("\n")
+
+def program_input(path): # lines of the program's .input file, if it has one
+    input_path = path[:-len(".brewin")] + ".input"
+    if (not os.path.exists(input_path)):
+        return INPUT
+    with open(input_path) as f:
+        return f.read().splitlines()
+
+def expected(path): # {"output": printed lines, "error": [ErrorType name, line num] or None}
+    with open(path[:-len(".brewin")] + ".expected") as f:
+        return json.load(f)
+
+def outcome(interpreter, run):
+    error = None
+    try:
+        run()
+    except Exception:
+        if (interpreter.error_type == None): # not a Brewin error, a bug in the interpreter
+            raise
+        error = [interpreter.error_type.name, interpreter.error_line]
+    return {"output": interpreter.get_output(), "error": error}
@@ -0,0 +1,24 @@
+import pytest
+
+pytest.importorskip("intbase") # the course's InterpreterBase, which is not part of this repo
+
+from batch import run_batch
+from helpers import INPUT, programs, read_program, program_input, expected
+
+@pytest.mark.parametrize("processes", [0, 2])
+@pytest.mark.parametrize("version", [1, 2, 3])
+def test_batch(version, processes):
+    cases = programs(version)
+    jobs = [(read_program(path), program_input(path)) for name, path in cases]
+    results = sorted(run_batch(jobs, version = version, processes = processes), key = lambda result: result.index_)
+    assert [result.index_ for result in results] == list(range(len(cases)))
+    for result, (name, path) in zip(results, cases):
+        error = [result.error_type_, result.error_line_] if (result.error_type_ != None) else None
+        assert {"output": result.output_, "error": error} == expected(path), name
+        assert result.meter_["steps"] > 0 or error != None
+
+def test_batch_without_cache():
+    name, path = programs(3)[0]
+    jobs = [(read_program(path), INPUT)] * 3
+    for result in run_batch(jobs, processes = 0, cache_size = 0):
+        assert result.output_ == expected(path)["output"]
@@ -0,0 +1,86 @@
+import json
+import pytest
+
+pytest.importorskip("intbase") # the course's InterpreterBase, which is not part of this repo
+
+from budget import Budget
+from budget import BudgetExceeded
+from profiler import Sampler
+from batch import run_batch
+from helpers import LOOP, RECURSE, COUNT, GROW, SQUARE, interpreter
+
+@pytest.mark.parametrize("version", [1, 2, 3])
+def test_step_limit(version):
+    budget = Budget(max_steps = 1000)
+    with pytest.raises(BudgetExceeded) as e:
+        interpreter(version, budget = budget).run(LOOP[version])
+    assert e.value.limit_ == "steps"
+    assert budget.meter()["steps"] == 1001
+
+@pytest.mark.parametrize("version", [1, 2, 3])
+def test_time_limit(version):
+    with pytest.raises(BudgetExceeded) as e:
+        interpreter(version, budget = Budget(max_seconds = 0.05, check_every = 64)).run(LOOP[version])
+    assert e.value.limit_ == "seconds"
+
+@pytest.mark.parametrize("version", [1, 2, 3])
+def test_depth_limit(version):
+    budget = Budget(max_depth = 50)
+    with pytest.raises(BudgetExceeded) as e:
+        interpreter(version, budget = budget).run(RECURSE[version])
+    assert e.value.limit_ == "depth"
+    assert budget.meter()["calls"] == 51
+
+def test_heap_limit():
+    with pytest.raises(BudgetExceeded) as e:
+        interpreter(3, budget = Budget(max_heap = 100000, check_every = 8)).run(GROW[3])
+    assert e.value.limit_ == "heap"
+
+@pytest.mark.parametrize("program", [GROW, SQUARE], ids = ["strings", "ints"])
+@pytest.mark.parametrize("version", [1, 2, 3])
+def test_heap_limit_by_default(version, program): # values that double every statement are stopped before they are made, not at the next check
+    budget = Budget(max_heap = 10**6, max_seconds = 5)
+    with pytest.raises(BudgetExceeded) as e:
+        interpreter(version, budget = budget).run(program[version])
+    assert e.value.limit_ == "heap" and e.value.line_num_ == len(program[version]) - 3
+    assert budget.meter()["heap_peak"] <= 10**6
+    assert budget.meter()["steps"] < budget.check_every_
+
+def test_metering():
+    budget = Budget()
+    brewin = interpreter(3, budget = budget)
+    brewin.run(COUNT)
+    assert brewin.get_output() == ["720"]
+    meter = budget.meter()
+    assert meter["calls"] == 7
+    assert meter["max_depth"] == 7
+    assert meter["steps"] > 0 and meter["allocations"] >= meter["calls"]
+
+def test_batch_budget():
+    results = sorted(run_batch([(LOOP[3], None), (COUNT, None)], processes = 0, budget = Budget(max_steps = 10000)), key = lambda result: result.index_)
+    assert results[0].error_type_ == "BUDGET_EXCEEDED"
+    assert results[0].meter_["steps"] == 10001
+    assert results[1].error_type_ == None and results[1].output_ == ["720"]
+
+def test_batch_meter_of_compile_error():
+    broken = ["func main void", " var int x", " while True", "endfunc"] # v3 finds the unclosed while while compiling
+    results = sorted(run_batch([(COUNT, None), (broken, None)], processes = 0), key = lambda result: result.index_)
+    assert results[0].meter_["steps"] > 0
+    assert results[1].error_type_ == "SYNTAX_ERROR"
+    assert results[1].meter_["steps"] == 0 and results[1].meter_["calls"] == 0
+
+@pytest.mark.parametrize("version", [2, 3])
+def test_budget_profiler_and_sampler_together(version, tmp_path): # every hook runs in the one instrumented loop
+    profile = str(tmp_path / "profile.json")
+    sampler = Sampler(every = 1)
+    budget = Budget(max_steps = 10000)
+    brewin = interpreter(version, trace_output = profile, sampler = sampler, budget = budget)
+    brewin.run(COUNT)
+    assert brewin.get_output() == ["720"]
+    report = json.load(open(profile))
+    hits = sum(row["hits"] for row in report["lines"])
+    assert hits == budget.meter()["steps"] == sum(sampler.counts_.values())
+    assert sum(row["self"] for row in report["funcs"]) > 0
+    assert budget.meter()["calls"] == 7
+    with pytest.raises(BudgetExceeded): # and the limits still hold
+        interpreter(version, trace_output = profile, sampler = Sampler(every = 10), budget = Budget(max_steps = 500)).run(LOOP[version])
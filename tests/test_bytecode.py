@@ -0,0 +1,37 @@
+import marshal
+import importlib
+import pytest
+
+pytest.importorskip("intbase") # the course's InterpreterBase, which is not part of this repo
+
+PROGRAM = ["func main void", " var int x", " assign x + 1 2", " while < x 5", "  assign x + x 1", " endwhile", " funccall print x", "endfunc"]
+
+def interpreter():
+    return importlib.import_module("interpreterv3").Interpreter(console_output = False)
+
+def test_dump_and_load():
+    brewin = interpreter()
+    bytecode = brewin.compile(PROGRAM)
+    loaded = brewin.load_bytecode(brewin.dump_bytecode(bytecode))
+    assert loaded == bytecode
+    other = interpreter() # as in a worker process that never compiled it
+    other.run_bytecode(loaded)
+    assert other.get_output() == ["5"]
+
+def test_load_rejects_other_versions():
+    brewin = interpreter()
+    bytecode = brewin.compile(PROGRAM)
+    with pytest.raises(ValueError):
+        brewin.load_bytecode(marshal.dumps((brewin.BYTECODE_VERSION + 1,) + bytecode[1:]))
+
+def test_disassemble():
+    brewin = interpreter()
+    assert brewin.disassemble(brewin.compile(PROGRAM)) == [
+        "    0  FUNC          main () void () slots=7",
+        "    1  VAR           int (6)",
+        "    2  ASSIGN_TYPED  x@0:6 [2 1 +:int]",
+        "    3  WHILE         [5 x@0:6 <:int] -> 6 slots=0",
+        "    4  ASSIGN_TYPED  x@0:6 [1 x@0:6 +:int]",
+        "    5  ENDWHILE      -> 3",
+        "    6  PRINT         [x@0:6]",
+        "    7  ENDFUNC       "]
@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip("intbase") # the course's InterpreterBase, which is not part of this repo
+
+from cache import ProgramCache
+from helpers import LOOP, COUNT, interpreter, programs, read_program, program_input, expected, outcome
+
+@pytest.mark.parametrize("version", [1, 2, 3])
+def test_cache_round_trip(version, tmp_path): # a run compiling into the cache and a run loading from it behave the same
+    cache = ProgramCache(str(tmp_path))
+    for name, path in programs(version):
+        for _ in range(2):
+            brewin = interpreter(version, input = program_input(path), cache = cache)
+            assert outcome(brewin, lambda: brewin.run(read_program(path))) == expected(path), name
+    assert cache.hits_ == len(cache.entries()) > 0 # programs failing to compile are never stored
+
+def test_cache_recompiles_broken_files(tmp_path):
+    cache = ProgramCache(str(tmp_path))
+    program = read_program(programs(3)[0][1])
+    cache.bytecode(interpreter(3), program)
+    for last_use, size, path in cache.entries():
+        data = open(path, "rb").read()
+        with open(path, "wb") as f:
+            f.write(data[:-4] + b"xxxx")
+    cache.bytecode(interpreter(3), program)
+    assert (cache.hits_, cache.misses_) == (0, 2)
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ProgramCache(str(tmp_path), max_entries = 2)
+    brewin = interpreter(3)
+    paths = programs(3)[:3]
+    for name, path in paths:
+        cache.bytecode(brewin, read_program(path))
+    assert len(cache.entries()) == 2
+    cache.bytecode(brewin, read_program(paths[0][1])) # evicted, so compiled again
+    assert cache.misses_ == 4
+
+@pytest.mark.parametrize("version", [1, 2, 3])
+def test_profiler_source_of_loaded_bytecode(version, tmp_path): # cache hits and run_bytecode calls still show each line's source
+    cache = ProgramCache(str(tmp_path / "cache"))
+    program = COUNT if (version != 1) else LOOP[1][:2] + ["endfunc"]
+    for _ in range(2):
+        brewin = interpreter(version, trace_output = str(tmp_path / "profile.json"), cache = cache)
+        brewin.run(program)
+        assert all(row["source"] == program[row["line"]].strip() for row in brewin.profiler_.lines())
+    assert cache.hits_ == 1
+    brewin = interpreter(version, trace_output = str(tmp_path / "profile.json"))
+    bytecode = brewin.load_bytecode(brewin.dump_bytecode(brewin.compile(program)))
+    brewin.reset_all_variables()
+    brewin.run_bytecode(bytecode)
+    assert all(row["source"] == program[row["line"]].strip() for row in brewin.profiler_.lines())
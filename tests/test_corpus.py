@@ -0,0 +1,25 @@
+import os
+import importlib
+import pytest
+
+pytest.importorskip("intbase") # the course's InterpreterBase, which is not part of this repo
+
+from streams import FileSource, MmapSource
+from helpers import programs, read_program, program_input, expected, outcome
+
+CASES = [(version, name, path) for version in (1, 2, 3) for name, path in programs(version)]
+
+@pytest.mark.parametrize("version, name, path", CASES, ids = ["v%d-%s" % (case[0], case[1]) for case in CASES])
+def test_program(version, name, path):
+    interpreter = importlib.import_module("interpreterv" + str(version)).Interpreter(console_output = False, input = program_input(path))
+    assert outcome(interpreter, lambda: interpreter.run(read_program(path))) == expected(path)
+
+INPUT_CASES = [case for case in CASES if (os.path.exists(case[2][:-len(".brewin")] + ".input"))]
+
+@pytest.mark.parametrize("source_type", [FileSource, MmapSource])
+@pytest.mark.parametrize("version, name, path", INPUT_CASES, ids = ["v%d-%s" % (case[0], case[1]) for case in INPUT_CASES])
+def test_program_input_source(version, name, path, source_type): # same outcome reading the .input file through a source
+    source = source_type(path[:-len(".brewin")] + ".input")
+    interpreter = importlib.import_module("interpreterv" + str(version)).Interpreter(console_output = False, input_source = source)
+    assert outcome(interpreter, lambda: interpreter.run(read_program(path))) == expected(path)
+    source.close()
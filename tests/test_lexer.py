@@ -0,0 +1,18 @@
+import importlib
+import pytest
+
+pytest.importorskip("intbase") # the course's InterpreterBase, which is not part of this repo
+
+@pytest.mark.parametrize("version", [1, 2, 3])
+def test_typed_tokens(version):
+    brewin = importlib.import_module("interpreterv" + str(version)).Interpreter(console_output = False)
+    lines = iter(["func main void # entry", "  assign s \"a # b\"", " funccall print + -3 x True"]) # any iterable of lines
+    assert list(brewin.lex(lines)) == [
+        (0, [("identifier", "func", 0), ("identifier", "main", 5), ("identifier", "void", 10)]),
+        (1, [("identifier", "assign", 2), ("identifier", "s", 9), ("string literal", "\"a # b\"", 11)]),
+        (2, [("identifier", "funccall", 1), ("identifier", "print", 10), ("operator", "+", 16), ("int literal", "-3", 18),
+             ("identifier", "x", 21), ("bool literal", "True", 23)])]
+
+def test_member_tokens():
+    brewin = importlib.import_module("interpreterv3").Interpreter(console_output = False)
+    assert list(brewin.lex(["assign o.x 1"])) == [(0, [("identifier", "assign", 0), ("member", "o.x", 7), ("int literal", "1", 11)])]
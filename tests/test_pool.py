@@ -0,0 +1,40 @@
+import threading
+import pytest
+
+pytest.importorskip("intbase") # the course's InterpreterBase, which is not part of this repo
+
+from pool import InterpreterPool
+from helpers import COUNT, interpreter, programs, read_program, program_input, expected, outcome
+
+@pytest.mark.parametrize("version", [1, 2, 3])
+def test_reused_interpreter(version): # one instance runs the whole corpus, nothing leaks from one program into the next
+    brewin = interpreter(version)
+    for name, path in programs(version):
+        brewin.reset()
+        brewin.input = program_input(path)
+        assert outcome(brewin, lambda: brewin.run(read_program(path))) == expected(path), name
+
+@pytest.mark.parametrize("version", [1, 2, 3])
+def test_pool_reuses_interpreters(version): # released interpreters run the next program as new ones would
+    pool = InterpreterPool(version = version, size = 1, console_output = False)
+    used = set()
+    for name, path in programs(version):
+        with pool.interpreter(input = program_input(path)) as brewin:
+            assert outcome(brewin, lambda: brewin.run(read_program(path))) == expected(path), name
+            used.add(id(brewin))
+    assert len(used) == 1
+
+def test_pool_threads():
+    pool = InterpreterPool(version = 3, size = 2)
+    outputs = []
+    def work():
+        for _ in range(5):
+            with pool.interpreter() as brewin:
+                brewin.run(COUNT)
+                outputs.append(brewin.get_output())
+    threads = [threading.Thread(target = work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert outputs == [["720"]] * 20
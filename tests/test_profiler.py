@@ -0,0 +1,35 @@
+import json
+import pytest
+
+pytest.importorskip("intbase") # the course's InterpreterBase, which is not part of this repo
+
+from budget import Budget
+from helpers import COUNT, interpreter
+
+@pytest.mark.parametrize("version", [2, 3])
+def test_profiler(version, tmp_path):
+    path = str(tmp_path / "profile.json")
+    brewin = interpreter(version, trace_output = path)
+    brewin.run(COUNT)
+    report = json.load(open(path))
+    funcs = {row["func"]: row for row in report["funcs"]}
+    assert funcs["fact"]["hits"] == 7 and funcs["main"]["hits"] == 1
+    assert funcs["main"]["cumulative"] >= funcs["fact"]["cumulative"]
+    assert any(row["source"] == "funccall fact m" for row in report["lines"])
+
+def test_failed_call_is_not_counted(tmp_path): # the args do not bind, so f is never entered
+    path = str(tmp_path / "profile.json")
+    budget = Budget()
+    brewin = interpreter(2, trace_output = path, budget = budget)
+    with pytest.raises(Exception):
+        brewin.run(["func f a:int void", "endfunc", "func main void", "  funccall f \"x\"", "endfunc"])
+    assert brewin.error_type.name == "TYPE_ERROR"
+    assert budget.meter()["calls"] == 0 and budget.depth_ == 0
+    assert [row["func"] for row in json.load(open(path))["funcs"]] == ["main"]
+
+def test_profile_table(capsys): # trace_output = True prints the report to stderr
+    brewin = interpreter(3, trace_output = True)
+    brewin.run(COUNT)
+    report = capsys.readouterr().err
+    assert report.startswith("func") and "funccall fact m" in report
+    assert brewin.get_output() == ["720"]
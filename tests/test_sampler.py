@@ -0,0 +1,38 @@
+import threading
+import pytest
+
+pytest.importorskip("intbase") # the course's InterpreterBase, which is not part of this repo
+
+from profiler import Sampler
+from helpers import COUNT, interpreter
+
+@pytest.mark.parametrize("version", [2, 3])
+def test_sampler_every(version, tmp_path):
+    path = str(tmp_path / "stacks.txt")
+    sampler = Sampler(path, every = 1)
+    interpreter(version, sampler = sampler).run(COUNT)
+    stacks = dict(line.rsplit(" ", 1) for line in open(path).read().splitlines())
+    assert "main;fact;fact;fact;fact;fact;fact;fact" in stacks
+
+def busy(version, error): # runs long enough for the timer thread to take samples, then ends or fails
+    program = ["func main void", " var int x", " while < x " + ("3000" if (version == 2) else "30000"), "  assign x + x 1", " endwhile", "endfunc"]
+    if (error):
+        program.insert(-1, " assign x \"not an int\"")
+    return program
+
+@pytest.mark.parametrize("error", [False, True])
+@pytest.mark.parametrize("version", [2, 3])
+def test_sampler_timer(version, error, tmp_path): # the thread is stopped and the stacks written whether the run ends or raises
+    path = tmp_path / "stacks.txt"
+    sampler = Sampler(str(path), interval = 0.001)
+    threads = threading.active_count()
+    brewin = interpreter(version, sampler = sampler)
+    if (error):
+        with pytest.raises(Exception):
+            brewin.run(busy(version, error))
+        assert brewin.error_type.name == "TYPE_ERROR"
+    else:
+        brewin.run(busy(version, error))
+    assert sampler.thread_ == None and threading.active_count() == threads
+    assert path.read_text() == sampler.collapsed()
+    assert set(sampler.counts_) == {"main"} and sum(sampler.counts_.values()) > 0
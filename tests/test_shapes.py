@@ -0,0 +1,12 @@
+import pytest
+
+pytest.importorskip("intbase") # the course's InterpreterBase, which is not part of this repo
+
+from helpers import interpreter
+
+def test_shapes_are_per_program(): # member layouts of earlier programs are not kept alive by a reused interpreter
+    brewin = interpreter(3)
+    for index in range(50):
+        brewin.run(["func main void", " var object o", " assign o.m%d 1" % index, " funccall print o.m%d" % index, "endfunc"])
+        assert len(brewin.root_shape_.next_) == 1
+    assert interpreter(3).root_shape_ is not brewin.root_shape_
@@ -0,0 +1,91 @@
+import io
+import importlib
+import pytest
+
+from streams import StreamSink, FileSink, CallbackSink, RingBufferSink, DiscardSink
+from streams import StreamSource, FileSource, MmapSource
+
+READ_TWICE = {1: ["func main", " funccall input \"a \"", " funccall print result", " funccall input \"b \"", "endfunc"],
+              2: ["func main void", " funccall input \"a \"", " funccall print results", " funccall input \"b \"", "endfunc"],
+              3: ["func main void", " funccall input \"a \"", " funccall print results", " funccall input \"b \"", "endfunc"]} # reads one line more than it gets
+
+def interpreter(version, **options):
+    pytest.importorskip("intbase") # the course's InterpreterBase, which is not part of this repo
+    return importlib.import_module("interpreterv" + str(version)).Interpreter(console_output = False, **options)
+
+def test_stream_sink_batches_writes():
+    stream = io.StringIO()
+    sink = StreamSink(stream, flush_lines = 2)
+    sink.write("a")
+    assert stream.getvalue() == ""
+    sink.write("b")
+    sink.write("c")
+    assert stream.getvalue() == "a\nb\n"
+    sink.flush()
+    assert stream.getvalue() == "a\nb\nc\n"
+
+def test_file_sink(tmp_path):
+    path = str(tmp_path / "out.txt")
+    sink = FileSink(path)
+    sink.write("one")
+    sink.write("two")
+    sink.close()
+    sink = FileSink(path, append = True, flush_lines = 1)
+    sink.write("three")
+    assert open(path).read() == "one\ntwo\nthree\n"
+    sink.close()
+
+def test_ring_buffer_and_discard_sinks():
+    ring = RingBufferSink(capacity = 2)
+    discard = DiscardSink()
+    for line in ["a", "b", "c"]:
+        ring.write(line)
+        discard.write(line)
+    assert ring.lines() == ["b", "c"]
+    assert ring.dropped() == 1
+    assert discard.count_ == 3
+
+@pytest.mark.parametrize("version", [1, 2, 3])
+def test_callback_sink(version):
+    lines = []
+    brewin = interpreter(version, output_sink = CallbackSink(lines.append), input = ["5"])
+    with pytest.raises(Exception):
+        brewin.run(READ_TWICE[version])
+    assert lines == ["a ", "5", "b "]
+    assert brewin.get_output() == [] # the sink gets the lines instead of the output log
+
+def test_stream_source_reads_ahead():
+    source = StreamSource(io.StringIO("1\n2\n3\n4"), read_ahead = 3)
+    assert [source.readline(), source.readline()] == ["1", "2"]
+    assert source.read_remaining() == "3\n4"
+    assert source.readline() == None
+    assert source.read_remaining() == ""
+
+@pytest.mark.parametrize("source_type", [FileSource, MmapSource])
+def test_file_sources(source_type, tmp_path):
+    path = tmp_path / "in.txt"
+    path.write_text("first\nsecond\nthird\n")
+    source = source_type(str(path))
+    assert source.readline() == "first"
+    assert source.read_remaining() == "second\nthird"
+    assert source.readline() == None
+    source.close()
+    path.write_text("")
+    source = source_type(str(path))
+    assert (source.readline(), source.read_remaining()) == (None, "")
+    source.close()
+
+@pytest.mark.parametrize("version", [1, 2, 3])
+def test_exhausted_input_source(version):
+    brewin = interpreter(version, input_source = StreamSource(io.StringIO("5\n")))
+    with pytest.raises(Exception):
+        brewin.run(READ_TWICE[version])
+    assert brewin.get_output() == ["a ", "5", "b "]
+    assert (brewin.error_type.name, brewin.error_line) == ("FAULT_ERROR", 3)
+
+@pytest.mark.parametrize("version", [1, 2, 3])
+def test_exhausted_input_list(version):
+    brewin = interpreter(version, input = ["5"])
+    with pytest.raises(Exception):
+        brewin.run(READ_TWICE[version])
+    assert (brewin.error_type.name, brewin.error_line) == ("FAULT_ERROR", 3)